@@ -0,0 +1,74 @@
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class FakeLLM:
+    # Deterministic stand-ins for the OpenAI client and ollama.generate, with
+    # injectable per-call latency. Calls are counted by "<api>:<model>".
+
+    def __init__(self, latency=0.0, embedding_latency=None, ollama_latency=None, dimensions=256):
+        self.latency = latency
+        self.embedding_latency = latency if embedding_latency is None else embedding_latency
+        self.ollama_latency = latency if ollama_latency is None else ollama_latency
+        self.dimensions = dimensions
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self.openai = SimpleNamespace(
+            embeddings=SimpleNamespace(create=self._embed),
+            responses=SimpleNamespace(parse=self._parse),
+        )
+        self.ollama = SimpleNamespace(generate=self._generate)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.calls)
+
+    def vector(self, text):
+        # Hashed bag of words, so texts sharing words embed close together
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % self.dimensions] += 1.0
+        return vector
+
+    def _count(self, key, latency):
+        with self._lock:
+            self.calls[key] += 1
+        if latency:
+            time.sleep(latency)
+
+    def _embed(self, model, input, **kwargs):
+        self._count(f"openai.embeddings:{model}", self.embedding_latency)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self.vector(text).tolist()) for text in input])
+
+    def _parse(self, model, input, text_format, **kwargs):
+        # Shape the answer from the prompt the app sent, for each response model it uses
+        self._count(f"openai.responses:{model}", self.latency)
+        text = "\n".join(message["content"] for message in input)
+        fields = text_format.model_fields
+        if "scores" in fields:
+            ids = re.findall(r"^\[(\d+)\]$", text, re.MULTILINE)
+            parsed = text_format(scores=[
+                {"id": int(i), "score": (int(hashlib.md5(i.encode()).hexdigest()[:4], 16) % 100) / 100, "reason": "fake"}
+                for i in ids
+            ])
+        elif "reasons" in fields:
+            names = re.findall(r"^Note: (.+)$", text, re.MULTILINE)
+            parsed = text_format(reasons=[{"name": name, "reason": "fake"} for name in names])
+        else:
+            names = list(dict.fromkeys(re.findall(r"'([^']+\.md)'", text)))[:3]
+            parsed = text_format(names=[{"name": name, "reason": "fake"} for name in names])
+        return SimpleNamespace(output_parsed=parsed)
+
+    def _generate(self, model, prompt, **kwargs):
+        self._count(f"ollama.generate:{model}", self.ollama_latency)
+        return {"response": "Summary: " + " ".join(prompt.split()[-30:])}
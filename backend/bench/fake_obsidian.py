@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+
+class FakeObsidianServer:
+    # Stand-in for the Obsidian Local REST API plugin serving a directory:
+    # GET /vault/{folder}/ lists files, GET/PUT/POST /vault/{path} read,
+    # write and append notes. Runs on a thread in this process; every request
+    # sleeps latency seconds first and is counted by verb.
+
+    def __init__(self, vault_root, latency=0.0, host="127.0.0.1", port=0):
+        self.vault_root = vault_root
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._handle(self, "GET")
+
+            def do_PUT(self):
+                server._handle(self, "PUT")
+
+            def do_POST(self):
+                server._handle(self, "POST")
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-obsidian", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.calls)
+
+    def _handle(self, handler, verb):
+        with self._lock:
+            self.calls[verb] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        path = unquote(urlparse(handler.path).path)
+        if not path.startswith("/vault/"):
+            return self._send(handler, 404, b"Not found")
+        relative = path[len("/vault/"):]
+        full = os.path.join(self.vault_root, relative)
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        if verb == "GET" and relative.endswith("/"):
+            if not os.path.isdir(full):
+                return self._send(handler, 404, b"Not found")
+            files = sorted(relative + name for name in os.listdir(full) if not name.startswith("."))
+            return self._send(handler, 200, json.dumps({"files": files}).encode(), "application/json")
+        if verb == "GET":
+            if not os.path.isfile(full):
+                return self._send(handler, 404, b"Not found")
+            with open(full, "rb") as f:
+                return self._send(handler, 200, f.read(), "text/markdown; charset=utf-8")
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb" if verb == "PUT" else "ab") as f:
+            f.write(body)
+        self._send(handler, 204, b"")
+
+    @staticmethod
+    def _send(handler, status, body, content_type="text/plain"):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if body:
+            handler.wfile.write(body)
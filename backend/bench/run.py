@@ -0,0 +1,166 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench.fake_llm import FakeLLM
+from bench.fake_obsidian import FakeObsidianServer
+from bench.vault import generate_vault
+
+QUERIES = ["leadership robotics", "community service", "music", "research biology", "identity family culture",
+           "failure resilience", "coding hackathon", "climate policy"]
+PROMPTS = ["Describe a challenge you overcame", "Why this major?", "Tell us about a community you belong to",
+           "Reflect on a time you questioned a belief"]
+
+
+def load_app(workdir, obsidian_url, backend, vault_root, rate_limits):
+    # Fresh import of main against this run's vault, stores and caches
+    if not rate_limits:
+        # Measure the code, not the client-side OpenAI rate limits
+        os.environ.update(OPENAI_RPM="0", OPENAI_TPM="0")
+    os.environ.update(
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "bench"),
+        OBSIDIAN_HOST=obsidian_url,
+        OBSIDIAN_API_KEY="bench",
+        OBSIDIAN_VAULT_PATH=vault_root,
+        VAULT_BACKEND=backend,
+        VAULT_WATCH="off",
+        SUMMARY_PREWARM_INTERVAL="0",
+        EMBEDDINGS_FILE=os.path.join(workdir, "embeddings.npz"),
+        SUMMARY_CACHE_FILE=os.path.join(workdir, "summaries.db"),
+        JOBS_FILE=os.path.join(workdir, "jobs.db"),
+        STORE_FILE=os.path.join(workdir, "friday.db"),
+        BOARD_OPS_FILE=os.path.join(workdir, "board_ops.db"),
+    )
+    sys.modules.pop("main", None)
+    return importlib.import_module("main")
+
+
+def scenarios(client, note_names, batch_size):
+    # name -> request(i); each returns the response so failures are visible
+    def submit(i):
+        response = client.post("/submit", json={"type": "idea", "content": f"Benchmark idea {time.time_ns()} about {QUERIES[i % len(QUERIES)]}", "note_name": f"Bench {time.time_ns()}"})
+        job = response.json().get("job_id")
+        submitted_jobs.append(job)
+        return response
+
+    def batch_tag(i):
+        start = (i * batch_size) % max(1, len(note_names))
+        names = (note_names[start:] + note_names[:start])[:batch_size]
+        return client.post("/batch_tag", json={"note_names": names, "tags": [f"bench{i}"]})
+
+    submitted_jobs = []
+    return submitted_jobs, {
+        "/all_notes": lambda i: client.get("/all_notes"),
+        "/search text": lambda i: client.post("/search", json={"query": QUERIES[i % len(QUERIES)], "mode": "text"}),
+        "/search prompt": lambda i: client.post("/search", json={"query": PROMPTS[i % len(PROMPTS)], "mode": "prompt"}),
+        "/search_by_tags": lambda i: client.post("/search_by_tags", json={"tags": ["essay", "draft"]}),
+        "/stats": lambda i: client.get("/stats"),
+        "/batch_tag": batch_tag,
+        "/submit": submit,
+    }
+
+
+def measure(request, runs, obsidian, llm):
+    # Cold call, then `runs` warm calls: latencies (ms) and upstream calls per call
+    def timed(i):
+        start = time.perf_counter()
+        response = request(i)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return elapsed
+
+    obsidian.reset_calls()
+    llm.reset_calls()
+    cold = timed(0)
+    cold_calls = obsidian.snapshot() + llm.snapshot()
+    obsidian.reset_calls()
+    llm.reset_calls()
+    latencies = [timed(i) for i in range(1, runs + 1)]
+    warm_calls = obsidian.snapshot() + llm.snapshot()
+    return {
+        "cold_ms": cold,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "cold_calls": dict(cold_calls),
+        "calls_per_request": {key: count / runs for key, count in warm_calls.items()},
+    }
+
+
+def run_size(notes, args, out):
+    with tempfile.TemporaryDirectory(prefix="friday-bench-") as workdir:
+        vault_root = os.path.join(workdir, "vault")
+        generate_vault(vault_root, notes=notes, words=args.words, link_density=args.link_density, seed=args.seed)
+        obsidian = FakeObsidianServer(vault_root, latency=args.obsidian_latency / 1000).start()
+        llm = FakeLLM(latency=args.llm_latency / 1000, embedding_latency=args.embedding_latency / 1000,
+                      ollama_latency=args.ollama_latency / 1000)
+        try:
+            main = load_app(workdir, obsidian.url, args.backend, vault_root, args.rate_limits)
+            main.client = llm.openai
+            main.ollama = llm.ollama
+            from fastapi.testclient import TestClient
+            with TestClient(main.app) as client:
+                note_names = [note["name"] for note in client.get("/all_notes").json()["notes"]]
+                submitted_jobs, requests = scenarios(client, note_names, args.batch_size)
+                results = {}
+                for name, request in requests.items():
+                    if args.only and name not in args.only:
+                        continue
+                    results[name] = measure(request, args.runs, obsidian, llm)
+                    print(report_line(notes, name, results[name]), file=out, flush=True)
+                if submitted_jobs:
+                    # Background linking for the submitted notes, end to end
+                    start = time.perf_counter()
+                    statuses = [main.job_queue.wait(job_id, 600)["status"] for job_id in submitted_jobs if job_id]
+                    print(f"{notes:>6}  submit jobs: {statuses.count('done')}/{len(statuses)} done, "
+                          f"{(time.perf_counter() - start) * 1000:.0f} ms to drain after the last request",
+                          file=out, flush=True)
+            return results
+        finally:
+            obsidian.stop()
+
+
+def report_line(notes, name, result):
+    calls = ", ".join(f"{key}={value:g}" for key, value in sorted(result["calls_per_request"].items())) or "-"
+    return (f"{notes:>6}  {name:<16} cold {result['cold_ms']:>9.1f}  p50 {result['p50_ms']:>8.1f}  "
+            f"p95 {result['p95_ms']:>8.1f} ms  upstream/req: {calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FRIDAY backend against a fake vault and fake LLMs")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma-separated note counts")
+    parser.add_argument("--runs", type=int, default=20, help="warm requests per endpoint")
+    parser.add_argument("--backend", choices=["rest", "local"], default="rest")
+    parser.add_argument("--words", type=int, default=150, help="average words per note")
+    parser.add_argument("--link-density", type=float, default=2.0, help="average [[links]] per note")
+    parser.add_argument("--batch-size", type=int, default=50, help="notes per /batch_tag request")
+    parser.add_argument("--obsidian-latency", type=float, default=1.0, help="ms per Obsidian request")
+    parser.add_argument("--llm-latency", type=float, default=50.0, help="ms per OpenAI chat/structured call")
+    parser.add_argument("--embedding-latency", type=float, default=20.0, help="ms per embeddings call")
+    parser.add_argument("--ollama-latency", type=float, default=30.0, help="ms per Ollama generate call")
+    parser.add_argument("--only", nargs="*", help="endpoints to run, e.g. '/stats' '/search text'")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the OPENAI_RPM/OPENAI_TPM limits from the environment")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+    results = {}
+    for notes in [int(size) for size in args.sizes.split(",")]:
+        results[notes] = run_size(notes, args, out)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import random
+
+WORDS = (
+    "leadership robotics research community service music debate startup volunteer "
+    "engineering biology chemistry physics mathematics writing poetry history identity "
+    "family culture immigrant language resilience failure curiosity team captain club "
+    "project hackathon internship hospital patient coding algorithm design art theater "
+    "soccer basketball swimming orchestra violin piano summer camp tutoring mentor "
+    "environment climate sustainability policy economics entrepreneurship ethics "
+    "philosophy psychology neuroscience medicine astronomy literature journalism"
+).split()
+
+DEFAULT_TAGS = {"essay": 0.3, "draft": 0.2, "stanford": 0.1, "ut-austin": 0.1, "common-app": 0.15, "final": 0.05}
+
+
+def generate_vault(root, notes=1000, words=150, link_density=2.0, tags=None, idea_ratio=0.6, seed=0):
+    # Write a synthetic UndergraduateAdmission folder under root and return
+    # the note file names. Each note gets ~words words, on average
+    # link_density [[links]] to other notes, and each tag in tags
+    # ({tag: probability}) on its first line with that probability.
+    rng = random.Random(seed)
+    tags = DEFAULT_TAGS if tags is None else tags
+    folder = os.path.join(root, "UndergraduateAdmission")
+    os.makedirs(folder, exist_ok=True)
+    names = [
+        f"{'Idea' if rng.random() < idea_ratio else 'Piece'} - Note {i:05d}"
+        for i in range(notes)
+    ]
+    for name in names:
+        lines = []
+        note_tags = [tag for tag, probability in tags.items() if rng.random() < probability]
+        if note_tags:
+            lines.append(" ".join(f"#{tag}" for tag in note_tags))
+        # Zipf-ish word choice so some terms are common and most are rare
+        body = [WORDS[min(int(rng.paretovariate(1.2)) - 1, len(WORDS) - 1)] if rng.random() < 0.7
+                else rng.choice(WORDS) for _ in range(max(1, int(rng.gauss(words, words / 4))))]
+        lines.append(" ".join(body))
+        for _ in range(int(rng.expovariate(1 / link_density)) if link_density > 0 else 0):
+            target = rng.choice(names)
+            if target != name:
+                lines.append(f"[[{target}]] — related")
+        with open(os.path.join(folder, f"{name}.md"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+    return [f"{name}.md" for name in names]
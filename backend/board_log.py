@@ -0,0 +1,211 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+
+BOARD_OPS = ("add_node", "move_node", "update_node", "remove_node", "add_edge", "update_edge", "remove_edge")
+
+
+class BoardConflict(Exception):
+    # The board changed since the version the client patched
+    def __init__(self, board):
+        super().__init__("Board was modified")
+        self.board = board
+
+
+def apply_ops(board, ops, strict=True):
+    # Apply patch operations to a board in place. Every op sets state by id
+    # (add replaces, update merges, remove deletes), so replaying ops that
+    # are already part of the board leaves it unchanged. With strict=False
+    # (log replay) ops on missing nodes/edges are skipped instead of raising
+    # ValueError.
+    nodes = {node["id"]: node for node in board.get("nodes", [])}
+    edges = {edge["id"]: edge for edge in board.get("edges", [])}
+    for op in ops:
+        kind = op.get("op")
+        data = op.get("data") or {}
+        item_id = op.get("id") or data.get("id")
+        if kind not in BOARD_OPS:
+            raise ValueError(f"Unknown board op '{kind}'")
+        if not item_id:
+            raise ValueError(f"'{kind}' needs an id")
+        if kind == "add_node":
+            nodes[item_id] = {**data, "id": item_id}
+        elif kind == "add_edge":
+            source, target = data.get("source"), data.get("target")
+            if strict and (source not in nodes or target not in nodes):
+                raise ValueError(f"Edge '{item_id}' connects nodes that aren't on the board")
+            edges[item_id] = {**data, "id": item_id}
+        elif kind in ("move_node", "update_node"):
+            if item_id not in nodes:
+                if strict:
+                    raise ValueError(f"No node '{item_id}' on the board")
+                continue
+            fields = {"x": data.get("x"), "y": data.get("y")} if kind == "move_node" else data
+            nodes[item_id] = {**nodes[item_id], **fields, "id": item_id}
+        elif kind == "update_edge":
+            if item_id not in edges:
+                if strict:
+                    raise ValueError(f"No edge '{item_id}' on the board")
+                continue
+            edges[item_id] = {**edges[item_id], **data, "id": item_id}
+        elif kind == "remove_node":
+            if nodes.pop(item_id, None) is None and strict:
+                raise ValueError(f"No node '{item_id}' on the board")
+            # Edges can't outlive their nodes
+            edges = {
+                edge_id: edge for edge_id, edge in edges.items()
+                if edge.get("source") != item_id and edge.get("target") != item_id
+            }
+        elif kind == "remove_edge":
+            if edges.pop(item_id, None) is None and strict:
+                raise ValueError(f"No edge '{item_id}' on the board")
+    board["nodes"] = list(nodes.values())
+    board["edges"] = list(edges.values())
+    return board
+
+
+class BoardOpLog:
+    # Append-only log of idea-board patches. A patch only appends its ops (one
+    # small row) instead of rewriting the board; the current board is the
+    # stored snapshot with its logged ops replayed, kept in memory. A
+    # background thread folds the ops into the snapshot every compact_interval
+    # seconds (sooner once a board has compact_threshold pending ops) and
+    # truncates the log.
+
+    def __init__(self, path, store, collection="idea_boards", compact_interval=30.0, compact_threshold=200):
+        self.path = path
+        self.store = store
+        self.collection = collection
+        self.compact_interval = compact_interval
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._compact_requested = threading.Event()
+        self._thread = None
+        self._boards = {}
+        self._patches = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS board_ops ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " board_id TEXT NOT NULL,"
+            " modified REAL NOT NULL,"
+            " ops TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS board_ops_board ON board_ops (board_id, seq)")
+        self._db.commit()
+        # Boards with ops left over from the last run
+        for board_id, in self._db.execute("SELECT DISTINCT board_id FROM board_ops").fetchall():
+            self._boards[board_id] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._compact_loop, name="board-compactor", daemon=True)
+            self._thread.start()
+
+    def version(self):
+        # Changes with every patch and every write to the boards collection
+        with self._lock:
+            return f"{self.store.version(self.collection)}.{self._patches}"
+
+    def list(self):
+        with self._lock:
+            boards = self.store.list(self.collection)
+            return [self._current(board["id"], board) for board in boards]
+
+    def get(self, board_id):
+        with self._lock:
+            return self._current(board_id)
+
+    def patch(self, board_id, base_modified, ops, modified):
+        # Returns the patched board, None if it doesn't exist. Raises
+        # BoardConflict if base_modified is stale, ValueError for bad ops.
+        with self._lock:
+            board = self._current(board_id)
+            if board is None:
+                return None
+            if board.get("modified") != base_modified:
+                raise BoardConflict(board)
+            board = apply_ops(board, ops)
+            board["modified"] = modified
+            self._db.execute(
+                "INSERT INTO board_ops (board_id, modified, ops) VALUES (?, ?, ?)",
+                (board_id, modified, json.dumps(ops))
+            )
+            self._db.commit()
+            self._boards[board_id] = board
+            self._patches += 1
+            pending = self._db.execute("SELECT COUNT(*) FROM board_ops WHERE board_id = ?", (board_id,)).fetchone()[0]
+            if pending >= self.compact_threshold:
+                self._compact_requested.set()
+            return copy.deepcopy(board)
+
+    def replace(self, board):
+        # Full replacement (PUT): the new board supersedes any logged ops
+        with self._lock:
+            replaced = self.store.replace(self.collection, board)
+            self._truncate(board["id"])
+            return replaced
+
+    def delete(self, board_id):
+        with self._lock:
+            deleted = self.store.delete(self.collection, board_id)
+            self._truncate(board_id)
+            return deleted
+
+    def compact(self):
+        # Fold logged ops into the stored snapshots
+        with self._lock:
+            compacted = 0
+            for board_id in list(self._boards):
+                board = self._current(board_id)
+                last_seq = self._db.execute(
+                    "SELECT MAX(seq) FROM board_ops WHERE board_id = ?", (board_id,)
+                ).fetchone()[0]
+                if board is not None:
+                    self.store.replace(self.collection, board)
+                    compacted += 1
+                if last_seq is not None:
+                    self._db.execute("DELETE FROM board_ops WHERE board_id = ? AND seq <= ?", (board_id, last_seq))
+                self._db.commit()
+                del self._boards[board_id]
+            return compacted
+
+    def close(self):
+        with self._lock:
+            self.compact()
+            self._db.close()
+
+    def _current(self, board_id, snapshot=None):
+        # Stored snapshot with pending ops replayed (cached until compaction)
+        if board_id not in self._boards:
+            return snapshot if snapshot is not None else self.store.get(self.collection, board_id)
+        board = self._boards[board_id]
+        if board is None:
+            board = self.store.get(self.collection, board_id)
+            if board is None:
+                return None
+            for modified, ops in self._db.execute(
+                "SELECT modified, ops FROM board_ops WHERE board_id = ? ORDER BY seq", (board_id,)
+            ).fetchall():
+                apply_ops(board, json.loads(ops), strict=False)
+                board["modified"] = modified
+            self._boards[board_id] = board
+        return copy.deepcopy(board)
+
+    def _truncate(self, board_id):
+        self._db.execute("DELETE FROM board_ops WHERE board_id = ?", (board_id,))
+        self._db.commit()
+        self._boards.pop(board_id, None)
+
+    def _compact_loop(self):
+        while True:
+            self._compact_requested.wait(self.compact_interval)
+            self._compact_requested.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Error compacting idea board ops: {e}")
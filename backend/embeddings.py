@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from note_cache import content_hash
+
+
+class EmbeddingStore:
+    # Note embeddings keyed by the hash of the embedded text and persisted to
+    # an .npz file, so only new or edited notes are ever sent to the
+    # embeddings API. Similarity search is one normalized matrix product.
+
+    def __init__(self, path, embed, model, batch_size=64, max_chars=8000):
+        self.path = path
+        self.embed = embed
+        self.model = model
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._vectors = {}
+        # Matrix for the last set of notes searched, rebuilt only when it changes
+        self._names = []
+        self._hashes = []
+        self._matrix = None
+        self._load()
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def prepare(self, text):
+        return text.strip()[:self.max_chars]
+
+    def search(self, query, texts, k=10, min_score=0.0):
+        # [(note name, cosine similarity)] of the top k notes in texts
+        # ({note name: text}), embedding any note text that isn't stored yet
+        query_vector = self._normalize(self.embed([self.prepare(query)])[0])
+        with self._lock:
+            names, matrix = self._matrix_for(texts)
+        if matrix is None:
+            return []
+        scores = matrix @ query_vector
+        k = min(k, len(names))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(names[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def _matrix_for(self, texts):
+        prepared = {name: self.prepare(text) for name, text in texts.items()}
+        hashes = {name: content_hash(text) for name, text in prepared.items() if text}
+        names = sorted(hashes)
+        if names == self._names and [hashes[n] for n in names] == self._hashes:
+            return self._names, self._matrix
+        missing = {digest: prepared[name] for name, digest in hashes.items() if digest not in self._vectors}
+        if missing:
+            self._embed_missing(missing, keep=set(hashes.values()))
+        self._names = names
+        self._hashes = [hashes[n] for n in names]
+        self._matrix = np.vstack([self._vectors[h] for h in self._hashes]) if names else None
+        return self._names, self._matrix
+
+    def _embed_missing(self, missing, keep):
+        digests = list(missing)
+        for start in range(0, len(digests), self.batch_size):
+            batch = digests[start:start + self.batch_size]
+            vectors = self.embed([missing[digest] for digest in batch])
+            for digest, vector in zip(batch, vectors):
+                self._vectors[digest] = self._normalize(vector)
+        # Once the store is mostly stale note versions, drop everything the
+        # current notes don't reference before persisting
+        if len(self._vectors) > 2 * len(keep):
+            self._vectors = {h: v for h, v in self._vectors.items() if h in keep}
+        self._save()
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if str(data["model"]) != self.model:
+                    return
+                self._vectors = dict(zip(data["hashes"].tolist(), data["vectors"]))
+        except Exception as e:
+            print(f"Error loading embeddings from {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        hashes = list(self._vectors)
+        vectors = np.vstack([self._vectors[h] for h in hashes]) if hashes else np.zeros((0, 0), dtype=np.float32)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, model=np.array(self.model), hashes=np.array(hashes), vectors=vectors)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving embeddings to {self.path}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,249 @@
+import threading
+from collections import Counter, OrderedDict, deque
+
+import numpy as np
+
+
+def build_csr(size, sources, targets):
+    # Compressed sparse rows: the neighbours of node i are
+    # indices[indptr[i]:indptr[i + 1]], sorted
+    order = np.lexsort((targets, sources))
+    sources = sources[order]
+    indices = targets[order].astype(np.int32)
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+    return indptr, indices
+
+
+class CSRGraph:
+    # Immutable array-backed view of the link graph. Nodes are numbered in
+    # sorted note order; "out" follows [[links]], "in" follows backlinks and
+    # "both" treats the graph as undirected.
+
+    def __init__(self, notes, edges):
+        self.notes = list(notes)
+        self.index = {note: i for i, note in enumerate(self.notes)}
+        size = len(self.notes)
+        if edges:
+            pairs = np.array([(self.index[a], self.index[b]) for a, b in edges], dtype=np.int64)
+        else:
+            pairs = np.zeros((0, 2), dtype=np.int64)
+        undirected = np.unique(np.concatenate([pairs, pairs[:, ::-1]]), axis=0)
+        self.csr = {
+            "out": build_csr(size, pairs[:, 0], pairs[:, 1]),
+            "in": build_csr(size, pairs[:, 1], pairs[:, 0]),
+            "both": build_csr(size, undirected[:, 0], undirected[:, 1]),
+        }
+
+    def __len__(self):
+        return len(self.notes)
+
+    def neighbors(self, node, direction="both"):
+        indptr, indices = self.csr[direction]
+        return indices[indptr[node]:indptr[node + 1]]
+
+    def degrees(self, direction="both"):
+        return np.diff(self.csr[direction][0])
+
+    def bfs(self, start, max_depth=None, direction="both"):
+        # node -> hop distance from start, for every node within max_depth
+        indptr, indices = self.csr[direction]
+        distance = np.full(len(self.notes), -1, dtype=np.int32)
+        distance[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        depth = 0
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            depth += 1
+            reached = np.concatenate([indices[indptr[i]:indptr[i + 1]] for i in frontier])
+            reached = np.unique(reached)
+            frontier = reached[distance[reached] < 0]
+            distance[frontier] = depth
+        found = np.flatnonzero(distance >= 0)
+        return dict(zip(found.tolist(), distance[found].tolist()))
+
+    def shortest_path(self, start, goal, direction="both", reached=None):
+        # Node ids from start to goal (inclusive), or None if unreachable.
+        # Every node the search discovered is added to `reached`, if given.
+        indptr, indices = self.csr[direction]
+        parent = {start: start}
+        queue = deque([start])
+        path = None
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = [node]
+                while node != start:
+                    node = parent[node]
+                    path.append(node)
+                path.reverse()
+                break
+            for neighbor in indices[indptr[node]:indptr[node + 1]].tolist():
+                if neighbor not in parent:
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+        if reached is not None:
+            reached.update(parent)
+        return path
+
+    def components(self):
+        # Connected components (ignoring direction) as a label per node:
+        # repeatedly take the smallest label among neighbours until stable
+        indptr, indices = self.csr["both"]
+        size = len(self.notes)
+        labels = np.arange(size, dtype=np.int64)
+        sources = np.repeat(np.arange(size), np.diff(indptr))
+        while True:
+            previous = labels.copy()
+            np.minimum.at(labels, sources, labels[indices])
+            labels = labels[labels]  # pointer jumping
+            if np.array_equal(labels, previous):
+                return labels
+
+    def communities(self, iterations=10):
+        # Label propagation: every node adopts the most common label among its
+        # neighbours (ties -> smallest label), in node order, until stable
+        indptr, indices = self.csr["both"]
+        labels = list(range(len(self.notes)))
+        for _ in range(iterations):
+            changed = False
+            for node in range(len(labels)):
+                neighbors = indices[indptr[node]:indptr[node + 1]]
+                if not len(neighbors):
+                    continue
+                counts = Counter(labels[n] for n in neighbors.tolist())
+                best = max(counts.values())
+                label = min(l for l, c in counts.items() if c == best)
+                if label != labels[node]:
+                    labels[node] = label
+                    changed = True
+            if not changed:
+                break
+        return np.array(labels, dtype=np.int64)
+
+
+class GraphAnalytics:
+    # CSR snapshot of a LinkGraph plus an LRU of query results. Only writes
+    # that change links bump the link graph's version, so tag edits and other
+    # content changes keep everything cached. When links do change, the CSR is
+    # rebuilt from a fresh snapshot but only results that could have changed
+    # are dropped: each entry records the notes it depends on (None for
+    # whole-graph results) and is kept unless one of them gained or lost a link.
+
+    def __init__(self, link_graph, cache_size=256):
+        self.link_graph = link_graph
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._graph = None
+        self._version = None
+        self._edges = set()
+        # key -> (value, notes the value depends on or None)
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.invalidated = 0
+
+    def graph(self):
+        with self._lock:
+            if self._graph is None or self._version != self.link_graph.version:
+                version, notes, edges = self.link_graph.snapshot()
+                edges = set(edges)
+                if self._graph is not None:
+                    self._invalidate(self._changed_notes(notes, edges))
+                self._graph = CSRGraph(notes, sorted(edges))
+                self._version = version
+                self._edges = edges
+                self.builds += 1
+            return self._graph
+
+    def _changed_notes(self, notes, edges):
+        # Notes added or removed, plus both ends of every added or removed link
+        changed = set(self._graph.notes).symmetric_difference(notes)
+        for source, target in self._edges.symmetric_difference(edges):
+            changed.add(source)
+            changed.add(target)
+        return changed
+
+    def _invalidate(self, changed):
+        if not changed:
+            return
+        for key, (_, depends) in list(self._cache.items()):
+            if depends is None or not depends.isdisjoint(changed):
+                del self._cache[key]
+                self.invalidated += 1
+
+    def cached(self, key, compute):
+        # compute(graph) returns (value, depends): the notes whose links the
+        # value was derived from, or None if it depends on the whole graph
+        graph = self.graph()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key][0]
+            self.misses += 1
+        value, depends = compute(graph)
+        with self._lock:
+            if self._graph is graph:
+                self._cache[key] = (value, frozenset(depends) if depends is not None else None)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return value
+
+    def neighbors(self, note, direction="both"):
+        def compute(graph):
+            return [graph.notes[i] for i in graph.neighbors(graph.index[note], direction).tolist()], {note}
+        return self.cached(("neighbors", note, direction), compute)
+
+    def k_hop(self, note, k, direction="both"):
+        # {note: distance} for notes within k hops, excluding note itself.
+        # A changed link can only alter the result through a note less than
+        # k hops away, since that's the only place it can be followed from.
+        def compute(graph):
+            distances = graph.bfs(graph.index[note], k, direction)
+            result = {graph.notes[i]: d for i, d in distances.items() if d > 0}
+            return result, {note, *(n for n, d in result.items() if d < k)}
+        return self.cached(("k_hop", note, k, direction), compute)
+
+    def shortest_path(self, source, target, direction="both"):
+        # Every note closer to source than target is reached before the search
+        # ends, so any link that could shorten or break the path starts at one
+        def compute(graph):
+            reached = set()
+            path = graph.shortest_path(graph.index[source], graph.index[target], direction, reached)
+            value = [graph.notes[i] for i in path] if path is not None else None
+            return value, {graph.notes[i] for i in reached}
+        return self.cached(("path", source, target, direction), compute)
+
+    def components(self):
+        # Largest first
+        return self.cached(("components",), lambda graph: (self._groups(graph, graph.components()), None))
+
+    def communities(self, iterations=10):
+        return self.cached(("communities", iterations), lambda graph: (self._groups(graph, graph.communities(iterations)), None))
+
+    def orphans(self):
+        # Notes with no links in or out
+        def compute(graph):
+            return [graph.notes[i] for i in np.flatnonzero(graph.degrees() == 0).tolist()], None
+        return self.cached(("orphans",), compute)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self._version,
+                "builds": self.builds,
+                "entries": len(self._cache),
+                "invalidated": self.invalidated,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _groups(graph, labels):
+        groups = {}
+        for i, label in enumerate(labels.tolist()):
+            groups.setdefault(label, []).append(graph.notes[i])
+        return sorted(groups.values(), key=lambda group: (-len(group), group[0]))
@@ -0,0 +1,121 @@
+import gzip
+
+import anyio.to_thread
+import orjson
+from fastapi.responses import JSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies at least this big are compressed off the event loop
+THREAD_MINIMUM_SIZE = 64 * 1024
+
+
+def json_dumps(content):
+    # JSON bytes via orjson (numpy arrays and non-string dict keys allowed)
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONResponse(JSONResponse):
+    # JSONResponse rendered with orjson, for endpoints with large payloads
+    def render(self, content):
+        return json_dumps(content)
+
+
+def accepted_encoding(accept_encoding):
+    # Best content coding the client accepts: "br" (when brotli is
+    # installed), then "gzip"; None means send the body as is
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[coding.strip().lower()] = quality
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if offered.get(coding, offered.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    if encoding == "gzip":
+        # mtime=0 keeps the output identical for identical bodies
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return body
+
+
+class CompressionMiddleware:
+    # ASGI middleware that compresses complete response bodies of at least
+    # minimum_size bytes with brotli or gzip, whichever the client prefers.
+    # Streamed bodies (NDJSON/SSE), event streams and responses that already
+    # carry a Content-Encoding (pre-encoded cache hits) pass through untouched.
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        encoding = accepted_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        start = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                response_headers = {key.lower(): value for key, value in message.get("headers", [])}
+                content_type = response_headers.get(b"content-type", b"")
+                passthrough = b"content-encoding" in response_headers or content_type.startswith(b"text/event-stream")
+                if passthrough:
+                    return await send(message)
+                # Hold the start until we know whether the body is complete
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+            if start is not None:
+                response_start, start = start, None
+                body = message.get("body", b"")
+                if message.get("more_body", False) or len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(response_start)
+                    return await send(message)
+                if len(body) >= THREAD_MINIMUM_SIZE:
+                    body = await anyio.to_thread.run_sync(self.compress, body, encoding)
+                else:
+                    body = self.compress(body, encoding)
+                vary = [value for key, value in response_start.get("headers", []) if key.lower() == b"vary"]
+                response_headers = [
+                    (key, value) for key, value in response_start.get("headers", [])
+                    if key.lower() not in (b"content-length", b"vary")
+                ]
+                response_headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+                ]
+                await send({**response_start, "headers": response_headers})
+                return await send({"type": "http.response.body", "body": body, "more_body": False})
+            await send(message)
+
+        await self.app(scope, receive, compressing_send)
+
+    def compress(self, body, encoding):
+        return compress(body, encoding, self.gzip_level, self.brotli_quality)
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class JobQueue:
+    # Small persistent background job queue. Job state lives in SQLite so it
+    # survives restarts (jobs that were running when the process died are
+    # queued again on start). Failed jobs are retried with exponential
+    # backoff, and jobs enqueued with a dedup_key that matches a queued or
+    # running job return that job instead of running twice.
+
+    def __init__(self, path, workers=1, max_attempts=3, retry_backoff=5.0, poll_interval=1.0,
+                 retention=7 * 24 * 3600):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " dedup_key TEXT,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " result TEXT,"
+            " error TEXT,"
+            " run_at REAL NOT NULL,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status_run_at ON jobs (status, run_at)")
+        self._db.commit()
+
+    def register(self, kind, handler):
+        # handler(payload) -> JSON-serializable result
+        self._handlers[kind] = handler
+
+    def start(self):
+        if self._threads:
+            return
+        with self._lock:
+            now = time.time()
+            self._db.execute("UPDATE jobs SET status = 'queued', updated = ? WHERE status = 'running'", (now,))
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                (now - self.retention,)
+            )
+            self._db.commit()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def find(self, dedup_key):
+        # Latest queued or running job with this dedup_key
+        with self._lock:
+            return self._find(dedup_key)
+
+    def enqueue(self, kind, payload, dedup_key=None):
+        with self._lock:
+            if dedup_key is not None:
+                existing = self._find(dedup_key)
+                if existing is not None:
+                    return existing
+            now = time.time()
+            job_id = str(uuid.uuid4())
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, dedup_key, payload, status, run_at, created, updated)"
+                " VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, dedup_key, json.dumps(payload), now, now, now)
+            )
+            self._db.commit()
+            self._changed.notify_all()
+            return self._job(self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job(row) if row is not None else None
+
+    def wait(self, job_id, timeout):
+        # Block until the job is done/failed or timeout seconds pass
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    return None
+                job = self._job(row)
+                remaining = deadline - time.monotonic()
+                if job["status"] in ("done", "failed") or remaining <= 0:
+                    return job
+                self._changed.wait(remaining)
+
+    def _find(self, dedup_key):
+        row = self._db.execute(
+            "SELECT * FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running') ORDER BY created DESC LIMIT 1",
+            (dedup_key,)
+        ).fetchone()
+        return self._job(row) if row is not None else None
+
+    def _work(self):
+        while True:
+            claimed = self._claim()
+            if claimed is None:
+                with self._lock:
+                    self._changed.wait(self.poll_interval)
+                continue
+            job_id, kind, payload, attempts = claimed
+            try:
+                handler = self._handlers[kind]
+                result = handler(payload)
+            except Exception as e:
+                print(f"Job {job_id} ({kind}) failed on attempt {attempts}: {e}")
+                self._fail(job_id, attempts, str(e))
+                continue
+            self._finish(job_id, result)
+
+    def _claim(self):
+        with self._lock:
+            now = time.time()
+            row = self._db.execute(
+                "SELECT id, kind, payload, attempts FROM jobs WHERE status = 'queued' AND run_at <= ?"
+                " ORDER BY run_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, kind, payload, attempts = row
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', attempts = ?, updated = ? WHERE id = ?",
+                (attempts + 1, now, job_id)
+            )
+            self._db.commit()
+            self._changed.notify_all()
+            return job_id, kind, json.loads(payload), attempts + 1
+
+    def _finish(self, job_id, result):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+            self._db.commit()
+            self._changed.notify_all()
+
+    def _fail(self, job_id, attempts, error):
+        with self._lock:
+            now = time.time()
+            if attempts < self.max_attempts:
+                # Retry later with exponential backoff
+                run_at = now + self.retry_backoff * (2 ** (attempts - 1))
+                self._db.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, run_at = ?, updated = ? WHERE id = ?",
+                    (error, run_at, now, job_id)
+                )
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+            self._db.commit()
+            self._changed.notify_all()
+
+    def _job(self, row):
+        columns = ("id", "kind", "dedup_key", "payload", "status", "attempts", "result", "error",
+                   "run_at", "created", "updated")
+        job = dict(zip(columns, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        del job["dedup_key"]
+        return job
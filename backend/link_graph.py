@@ -0,0 +1,159 @@
+import re
+import threading
+from collections import Counter, defaultdict
+
+LINK_PATTERN = re.compile(r'\[\[(.*?)\]\]')
+NOTE_FOLDER = "UndergraduateAdmission/"
+NOTE_PREFIXES = ("Idea - ", "Piece - ")
+
+
+def parse_links(content):
+    # Targets of every [[...]] link in the note, normalized so that
+    # [[Idea - X]], [[Idea - X.md]], [[UndergraduateAdmission/Idea - X.md|alias]]
+    # and [[Idea - X#Heading]] all resolve to "Idea - X"
+    return [normalize_target(raw) for raw in LINK_PATTERN.findall(content)]
+
+
+def normalize_target(raw):
+    target = raw.split("|", 1)[0].split("#", 1)[0].strip()
+    if target.startswith(NOTE_FOLDER):
+        target = target[len(NOTE_FOLDER):]
+    if target.endswith(".md"):
+        target = target[:-3]
+    return target
+
+
+def link_keys(note):
+    # The names other notes may use to link to this note: with and without
+    # the "Idea - " / "Piece - " prefix
+    without_ext = note.replace(".md", "")
+    without_prefix = without_ext
+    for prefix in NOTE_PREFIXES:
+        without_prefix = without_prefix.replace(prefix, "")
+    return {without_ext, without_prefix}
+
+
+class LinkGraph:
+    # Link graph over the vault, built from parsed [[...]] links and updated
+    # one note at a time. Notes are keyed by their file name inside the
+    # UndergraduateAdmission folder (e.g. "Idea - Robotics.md").
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._digests = {}
+        self._outgoing = {}
+        # link target -> Counter of source notes linking to it
+        self._incoming = defaultdict(Counter)
+        # link key (prefixed or unprefixed name) -> notes it resolves to
+        self._keys = defaultdict(set)
+        self.version = 0
+
+    def __contains__(self, note):
+        return note in self._outgoing
+
+    def notes(self):
+        with self._lock:
+            return list(self._outgoing)
+
+    def update(self, note, content, digest=None):
+        # Returns True if the note's outgoing links changed
+        with self._lock:
+            if digest is not None and self._digests.get(note) == digest:
+                return False
+            targets = Counter(parse_links(content))
+            previous = self._outgoing.get(note)
+            self._digests[note] = digest
+            if previous == targets:
+                return False
+            self._unlink(note)
+            if note not in self._outgoing:
+                for key in link_keys(note):
+                    self._keys[key].add(note)
+            self._outgoing[note] = targets
+            for target, count in targets.items():
+                self._incoming[target][note] += count
+            self.version += 1
+            return True
+
+    def remove(self, note):
+        with self._lock:
+            if note not in self._outgoing:
+                return
+            self._unlink(note)
+            del self._outgoing[note]
+            for key in link_keys(note):
+                self._keys[key].discard(note)
+                if not self._keys[key]:
+                    del self._keys[key]
+            self._digests.pop(note, None)
+            self.version += 1
+
+    def retain(self, notes):
+        # Drop notes that are no longer in the vault
+        keep = set(notes)
+        with self._lock:
+            for note in [n for n in self._outgoing if n not in keep]:
+                self.remove(note)
+
+    def outgoing(self, note):
+        with self._lock:
+            return Counter(self._outgoing.get(note, ()))
+
+    def incoming(self, note):
+        with self._lock:
+            sources = Counter()
+            for key in link_keys(note):
+                for source, count in self._incoming.get(key, {}).items():
+                    if source != note:
+                        sources[source] += count
+            return sources
+
+    def resolve(self, target):
+        # Notes a [[target]] link points at (normalized like parse_links)
+        with self._lock:
+            return set(self._keys.get(target, ()))
+
+    def neighbors(self, note):
+        # Notes this note links to plus notes linking to it
+        with self._lock:
+            linked = set()
+            for target in self._outgoing.get(note, ()):
+                linked.update(self._keys.get(target, ()))
+            linked.update(self.incoming(note))
+            linked.discard(note)
+            return linked
+
+    def edges(self):
+        # (source, note) for every link that resolves to a note in the graph
+        with self._lock:
+            pairs = set()
+            for note, targets in self._outgoing.items():
+                for target in targets:
+                    for linked in self._keys.get(target, ()):
+                        if linked != note:
+                            pairs.add((note, linked))
+            return sorted(pairs)
+
+    def snapshot(self):
+        # (version, notes, edges) captured together
+        with self._lock:
+            return self.version, sorted(self._outgoing), self.edges()
+
+    def out_degree(self, note):
+        with self._lock:
+            return sum(self._outgoing.get(note, {}).values())
+
+    def in_degree(self, note):
+        return sum(self.incoming(note).values())
+
+    def degree(self, note):
+        return self.out_degree(note) + self.in_degree(note)
+
+    def _unlink(self, note):
+        for target in self._outgoing.get(note, ()):
+            sources = self._incoming.get(target)
+            if sources is None:
+                continue
+            sources.pop(note, None)
+            if not sources:
+                del self._incoming[target]
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metrics import ContextThreadPoolExecutor
+
+
+class TokenBucket:
+    # Classic token bucket: holds up to `capacity` tokens and refills at
+    # capacity per minute. acquire() blocks until enough tokens are available.
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class LLMExecutor:
+    # Runs LLM calls with bounded concurrency (at most max_workers calls in
+    # flight, from the pool or any other thread), client-side requests-per-
+    # minute and tokens-per-minute limits, and an in-memory LRU cache keyed by
+    # (model, messages hash). Identical calls that are already in flight wait
+    # for the first one instead of being sent (and billed) again.
+
+    def __init__(self, name, max_workers=4, requests_per_minute=0, tokens_per_minute=0, cache_size=2048):
+        self.name = name
+        self.pool = ContextThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-llm")
+        # Pool threads hold at most one slot each, so work on the pool can't deadlock on it
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.seconds = 0.0
+        # observer(service, model, seconds, error) is told about every call sent
+        self.observer = None
+
+    @staticmethod
+    def key(model, messages):
+        payload = json.dumps(messages, sort_keys=True, default=str)
+        return f"{model}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def cached(self, key):
+        # (True, value) if key has a cached result, else (False, None)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return True, self._cache[key]
+            return False, None
+
+    def remember(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def call(self, model, messages, fn, tokens=0, cache=True):
+        # Run fn() in the calling thread under the rate limits; with cache=True
+        # the result is reused for identical (model, messages)
+        if not cache:
+            return self._run(model, fn, tokens)
+        key = self.key(model, messages)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                owner = True
+            else:
+                self.cache_hits += 1
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            result = self._run(model, fn, tokens)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        self.remember(key, result)
+        pending.set_result(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self.calls + self.cache_hits
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "seconds": self.seconds,
+                "cache_hits": self.cache_hits,
+                "cache_entries": len(self._cache),
+                "hit_ratio": self.cache_hits / lookups if lookups else 0.0,
+            }
+
+    def _run(self, model, fn, tokens):
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
+        with self._slots:
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = fn()
+                failed = False
+                return result
+            except BaseException:
+                with self._lock:
+                    self.errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.calls += 1
+                    self.seconds += elapsed
+                if self.observer is not None:
+                    self.observer(self.name, model, elapsed, failed)
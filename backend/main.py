@@ -1,19 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Literal
+from typing import List, Literal, NamedTuple, Optional
+from concurrent.futures import as_completed
+from collections import defaultdict
 import os
-import requests
 from dotenv import load_dotenv
 import ollama
-import re
-import json
 import uuid
 from openai import OpenAI
 from pydantic import BaseModel
 import logging
 from datetime import datetime
 import warnings
+import threading
+import time
+from note_cache import NoteCache, content_hash
+from link_graph import LinkGraph, normalize_target, parse_links
+from obsidian_client import ObsidianClient
+from vault_backend import LocalVaultBackend, RestVaultBackend
+from text_index import InvertedIndex, strip_links
+from embeddings import EmbeddingStore
+from summary_cache import SummaryCache
+from llm_executor import LLMExecutor
+from graph_analytics import GraphAnalytics
+from jobs import JobQueue
+from board_log import BoardConflict, BoardOpLog
+from storage import JsonDocumentStore, SqliteStore
+from tag_index import TagExpressionError, TagIndex, expression_tags, parse_tag_expression, parse_tags
+from watcher import VaultWatcher
+from metrics import ContextThreadPoolExecutor, Metrics, MetricsMiddleware
+from response_cache import ResponseCache, etag_matches
+from http_encoding import CompressionMiddleware, FastJSONResponse, accepted_encoding, json_dumps
 
 warnings.filterwarnings("ignore")
 
@@ -27,8 +47,149 @@ OBSIDIAN_API_KEY = os.getenv("OBSIDIAN_API_KEY", "")
 OBSIDIAN_HOST = os.getenv("OBSIDIAN_HOST", "http://localhost:27123")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def data_file(env_name, default_name):
+    # Storage file from the environment; relative paths are taken from
+    # BASE_DIR rather than the CWD, like the defaults
+    return os.path.join(BASE_DIR, os.getenv(env_name, default_name))
+
 client = OpenAI()
 
+# Every OpenAI / Ollama call goes through an executor: bounded concurrency,
+# client-side rate limits and a response cache keyed by (model, messages)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+# Request/upstream metrics for /metrics, and opt-in per-request traces
+metrics = Metrics(trace_capacity=int(os.getenv("TRACE_CAPACITY", "200")))
+
+openai_executor = LLMExecutor(
+    "openai",
+    max_workers=int(os.getenv("OPENAI_CONCURRENCY", "8")),
+    requests_per_minute=int(os.getenv("OPENAI_RPM", "500")),
+    tokens_per_minute=int(os.getenv("OPENAI_TPM", "200000")),
+    cache_size=LLM_CACHE_SIZE,
+)
+ollama_executor = LLMExecutor(
+    "ollama",
+    max_workers=int(os.getenv("OLLAMA_CONCURRENCY", "2")),
+    cache_size=LLM_CACHE_SIZE,
+)
+
+obsidian = ObsidianClient(
+    OBSIDIAN_HOST,
+    OBSIDIAN_API_KEY,
+    connect_timeout=float(os.getenv("OBSIDIAN_CONNECT_TIMEOUT", "3.05")),
+    read_timeout=float(os.getenv("OBSIDIAN_READ_TIMEOUT", "30")),
+    retries=int(os.getenv("OBSIDIAN_RETRIES", "3")),
+    backoff=float(os.getenv("OBSIDIAN_RETRY_BACKOFF", "0.3")),
+    pool_size=int(os.getenv("OBSIDIAN_POOL_SIZE", "16")),
+)
+
+# "rest" goes through the Obsidian Local REST API plugin, "local" reads and
+# writes OBSIDIAN_VAULT_PATH directly (same machine as the vault only)
+VAULT_BACKEND = os.getenv("VAULT_BACKEND", "rest")
+if VAULT_BACKEND == "local":
+    vault = LocalVaultBackend(
+        os.getenv("OBSIDIAN_VAULT_PATH", "."),
+        mmap_threshold=int(os.getenv("VAULT_MMAP_THRESHOLD", str(64 * 1024))),
+    )
+else:
+    vault = RestVaultBackend(obsidian)
+
+note_cache = NoteCache(
+    max_bytes=int(os.getenv("NOTE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    vault_path=os.getenv("OBSIDIAN_VAULT_PATH"),
+    ttl=float(os.getenv("NOTE_CACHE_TTL", "5")),
+)
+link_graph = LinkGraph()
+text_index = InvertedIndex()
+tag_index = TagIndex()
+graph_analytics = GraphAnalytics(link_graph, cache_size=int(os.getenv("GRAPH_CACHE_SIZE", "256")))
+
+# Tag queries answer from the indexes; the vault is rescanned (cheap when the
+# note cache is warm) when the last scan is older than this many seconds
+VAULT_RESCAN_INTERVAL = float(os.getenv("VAULT_RESCAN_INTERVAL", "30"))
+vault_scanned_at = None
+
+# Watch the vault folder for outside edits: "auto" (inotify, else polling),
+# "inotify", "poll" or "off". While a watcher runs, no periodic rescans are needed.
+VAULT_WATCH = os.getenv("VAULT_WATCH", "auto")
+VAULT_WATCH_DEBOUNCE = float(os.getenv("VAULT_WATCH_DEBOUNCE", "0.25"))
+VAULT_WATCH_POLL_INTERVAL = float(os.getenv("VAULT_WATCH_POLL_INTERVAL", "2"))
+vault_watcher = None
+
+# Idea/Piece notes as of the last scan, kept current by the watcher and our own
+# writes, and a counter bumped whenever any of them changes. Vault-derived read
+# endpoints are tagged and cached by it.
+vault_notes = {}
+vault_version = 0
+vault_state_lock = threading.Lock()
+
+# Responses of at least COMPRESS_MIN_SIZE bytes are sent brotli- (when the
+# brotli package is installed) or gzip-compressed, as the client accepts
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+# Encoded (and compressed) bodies of read endpoints by data version. ETags carry
+# a per-process epoch since the version counters start over at every restart.
+response_cache = ResponseCache(gzip_level=COMPRESS_GZIP_LEVEL, brotli_quality=COMPRESS_BROTLI_QUALITY)
+RESPONSE_EPOCH = uuid.uuid4().hex[:8]
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDINGS_FILE = data_file("EMBEDDINGS_FILE", "embeddings.npz")
+EMBEDDING_MIN_SCORE = float(os.getenv("EMBEDDING_MIN_SCORE", "0.2"))
+# Ask gpt-4o-mini for a short "reason" for each of the top prompt-search hits
+PROMPT_SEARCH_REASONS = os.getenv("PROMPT_SEARCH_REASONS", "1") == "1"
+
+def embed_texts(texts):
+    response = openai_executor.call(
+        EMBEDDING_MODEL,
+        texts,
+        lambda: client.embeddings.create(model=EMBEDDING_MODEL, input=texts),
+        tokens=sum(estimate_tokens(text) for text in texts),
+        cache=False
+    )
+    return [item.embedding for item in response.data]
+
+embedding_store = EmbeddingStore(EMBEDDINGS_FILE, embed_texts, EMBEDDING_MODEL)
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "llama3.2:latest")
+SUMMARY_PROMPT = "Summarize the following note in 3-4 sentences:\n\n{note_content}"
+summary_cache = SummaryCache(
+    data_file("SUMMARY_CACHE_FILE", "summaries.db"),
+    max_bytes=int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+)
+# Seconds between background passes that summarize new/edited notes, 0 disables
+SUMMARY_PREWARM_INTERVAL = float(os.getenv("SUMMARY_PREWARM_INTERVAL", "900"))
+# Seconds before retrying a pass that stopped because Ollama was unreachable,
+# doubled after every failed retry
+SUMMARY_PREWARM_RETRY = float(os.getenv("SUMMARY_PREWARM_RETRY", "60"))
+summary_prewarm_requested = threading.Event()
+
+# How many notes /submit retrieves as connection candidates for gpt-4o
+SUGGEST_CANDIDATES = int(os.getenv("SUGGEST_CANDIDATES", "20"))
+
+job_queue = JobQueue(
+    data_file("JOBS_FILE", "jobs.db"),
+    workers=int(os.getenv("JOB_WORKERS", "1")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF", "5")),
+)
+
+# Rough input-token budget per batched relevance-scoring request
+PROMPT_SCORING_TOKEN_BUDGET = int(os.getenv("PROMPT_SCORING_TOKEN_BUDGET", "6000"))
+
+# Bounded pool for bulk note fetches; keep it at or below OBSIDIAN_POOL_SIZE
+NOTE_FETCH_WORKERS = int(os.getenv("NOTE_FETCH_WORKERS", "8"))
+note_fetch_pool = ContextThreadPoolExecutor(max_workers=NOTE_FETCH_WORKERS, thread_name_prefix="note-fetch")
+
+TAG_WRITE_WORKERS = int(os.getenv("TAG_WRITE_WORKERS", "8"))
+tag_write_pool = ContextThreadPoolExecutor(max_workers=TAG_WRITE_WORKERS, thread_name_prefix="tag-write")
+
+note_locks = defaultdict(threading.Lock)
+note_locks_guard = threading.Lock()
+
 class Connection(BaseModel):
     name: str
     reason: str
@@ -36,6 +197,21 @@ class Connection(BaseModel):
 class SelectedConnections(BaseModel):
     names: list[Connection]
 
+class MatchReason(BaseModel):
+    name: str
+    reason: str
+
+class MatchReasons(BaseModel):
+    reasons: list[MatchReason]
+
+class NoteScore(BaseModel):
+    id: int
+    score: float
+    reason: str
+
+class NoteScores(BaseModel):
+    scores: list[NoteScore]
+
 app = FastAPI()
 
 # Add CORS middleware to allow OPTIONS requests (for CORS preflight) from the frontend (e.g. http://localhost:5173)
@@ -47,6 +223,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESS_MIN_SIZE,
+    gzip_level=COMPRESS_GZIP_LEVEL,
+    brotli_quality=COMPRESS_BROTLI_QUALITY,
+)
+
+# Outermost, so payload sizes are measured as sent
+app.add_middleware(MetricsMiddleware, metrics=metrics, routes=lambda: app.routes)
+
+openai_executor.observer = metrics.observe_upstream
+ollama_executor.observer = metrics.observe_upstream
+obsidian.observer = metrics.observe_upstream
+
+def cache_stats():
+    # (hits, misses) per cache
+    stats = {
+        "notes": note_cache.stats(),
+        "summaries": summary_cache.stats(),
+        "graph": graph_analytics.stats(),
+        "responses": response_cache.stats(),
+    }
+    counts = {name: (values["hits"], values["misses"]) for name, values in stats.items()}
+    for name, executor in [("openai", openai_executor), ("ollama", ollama_executor)]:
+        values = executor.stats()
+        counts[f"llm_{name}"] = (values["cache_hits"], values["calls"])
+    return counts
+
+metrics.register_collector(
+    "friday_cache_hits_total", "Cache hits", lambda: {(("cache", name),): hits for name, (hits, _) in cache_stats().items()},
+    kind="counter"
+)
+metrics.register_collector(
+    "friday_cache_misses_total", "Cache misses", lambda: {(("cache", name),): misses for name, (_, misses) in cache_stats().items()},
+    kind="counter"
+)
+metrics.register_collector(
+    "friday_cache_hit_ratio", "Cache hits / lookups",
+    lambda: {(("cache", name),): hits / (hits + misses) if hits + misses else 0.0 for name, (hits, misses) in cache_stats().items()}
+)
+
 class Submission(BaseModel):
     type: Literal["idea", "piece"]
     content: str
@@ -62,7 +279,9 @@ class SearchRequest(BaseModel):
     mode: Literal["text", "prompt"]
 
 class TagSearchRequest(BaseModel):
-    tags: List[str]
+    tags: List[str] = []
+    # e.g. "essay AND (draft OR final) AND NOT archived"; tags are ORed when omitted
+    expression: Optional[str] = None
 
 class SearchResult(BaseModel):
     name: str
@@ -131,67 +350,81 @@ class IdeaBoardUpdateRequest(BaseModel):
     created: float
     modified: float
 
+class IdeaBoardOp(BaseModel):
+    op: Literal["add_node", "move_node", "update_node", "remove_node", "add_edge", "update_edge", "remove_edge"]
+    id: Optional[str] = None
+    # Node/edge fields for add_*/update_*, {"x", "y"} for move_node
+    data: Optional[dict] = None
+
+class IdeaBoardPatchRequest(BaseModel):
+    base_modified: float
+    ops: List[IdeaBoardOp]
+    modified: Optional[float] = None
+
 @app.post("/submit")
 def submit(sub: Submission):
-    # 1. Create note in Obsidian via Local REST API (POST /vault/append)
+    # Persist the note right away; suggesting and linking connections runs in
+    # the background job queue. Poll GET /jobs/{job_id} for the suggestions.
     content = sub.content
     if sub.type == "piece" and sub.external:
         # Add #extern tag at the top
         content = "#extern\n" + content
-        
-    note_name = create_obsidian_note(sub.type, content, sub.note_name)
 
-    # 2. Get existing notes for context (GET /vault/list)
+    note_name = obsidian_note_name(sub.type, content, sub.note_name)
+    # A repeated submit of the same note while its job is still pending returns
+    # that job instead of rewriting the note under it. Once the job has
+    # finished, a resubmit (e.g. after deleting the note) creates it again.
+    dedup_key = f"{note_name}:{content_hash(content)}"
+    job = job_queue.find(dedup_key)
+    if job is None:
+        create_obsidian_note(sub.type, content, sub.note_name)
+        job = job_queue.enqueue("connect_note", {"note_name": note_name, "content": sub.content}, dedup_key=dedup_key)
+
+    return {"note_name": note_name, "job_id": job["id"], "status": job["status"]}
+
+def connect_note_job(payload):
+    note_name = payload["note_name"]
+    # Get existing notes for context
     existing_notes = list_obsidian_notes()
-    # 3. Use OpenAI to suggest connections, skip the new note itself
-    suggestions = suggest_connections(sub.content, existing_notes, new_note_name=note_name)
+    # Use OpenAI to suggest connections, skip the new note itself
+    suggestions = suggest_connections(payload["content"], existing_notes, new_note_name=note_name)
 
-    # 4. For each suggestion, append the connection to the new note
+    # Append all suggested connections to the new note in one write
     if suggestions and hasattr(suggestions, 'names'):
-        for conn in suggestions.names:
-            add_connection(note_name, conn.name, conn.reason)
+        append_connections(note_name, [(conn.name, conn.reason) for conn in suggestions.names])
+    summary_prewarm_requested.set()
 
-    return {"note_name": note_name, "suggestions": suggestions}
+    return {"note_name": note_name, "suggestions": jsonable_encoder(suggestions)}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, wait: float = 0.0):
+    # With ?wait=N, long-poll for up to N seconds (max 60) until the job finishes
+    if wait > 0:
+        job = job_queue.wait(job_id, min(wait, 60.0))
+    else:
+        job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @app.post("/connect")
 def connect(req: ConnectionRequest):
-    # Append [[connection]] to the new note (using POST /vault/append)
+    # Append every [[connection]] to the new note in one write
+    connections = []
     for conn in req.connections:
         if isinstance(conn, dict):
-            add_connection(req.new_note, conn.get("name"), conn.get("reason", ""))
+            connections.append((conn.get("name"), conn.get("reason", "")))
         else:
-            add_connection(req.new_note, conn, "")
-    return {"status": "connections added"}
+            connections.append((conn, ""))
+    added = append_connections(req.new_note, connections)
+    summary_prewarm_requested.set()
+    return {"status": "connections added", "added": added}
 
 @app.get("/stats")
-def get_stats():
+def get_stats(request: Request):
     print(os.getenv("OBSIDIAN_VAULT_PATH", "."))
     try:
-        # Get all notes from the vault
-        existing_notes = list_obsidian_notes()
-        # Filter to only include notes with "Idea" or "Piece" in the name
-        filtered_notes = [note for note in existing_notes if "Idea" in note or "Piece" in note]
-        
-        # Count different types
-        total_notes = len(filtered_notes)
-        ideas = len([note for note in filtered_notes if note.startswith("Idea -")])
-        pieces = len([note for note in filtered_notes if note.startswith("Piece -")])
-        
-        # Count connections
-        total_connections = 0
-        for note in filtered_notes:
-            content = get_note_content(note)
-            total_connections += content.count('[[')
-        
-        external_pieces = len([note for note in filtered_notes if is_external_note(get_note_content(note))])
-        
-        return {
-            "totalNotes": total_notes,
-            "ideas": ideas,
-            "pieces": pieces,
-            "connections": total_connections,
-            "externalPieces": external_pieces
-        }
+        return vault_response(request, "stats", vault_stats)
     except Exception as e:
         print("Error getting stats:", e)
         return {
@@ -202,275 +435,392 @@ def get_stats():
             "externalPieces": 0
         }
 
-@app.post("/search")
+def vault_stats():
+    # Get all notes from the vault
+    filtered_notes, note_contents = indexed_vault_notes()
+
+    # Count different types
+    total_notes = len(filtered_notes)
+    ideas = len([note for note in filtered_notes if note.startswith("Idea -")])
+    pieces = len([note for note in filtered_notes if note.startswith("Piece -")])
+
+    # Count connections
+    total_connections = 0
+    for note in filtered_notes:
+        total_connections += note_contents[note].count('[[')
+
+    external_pieces = len([note for note in filtered_notes if is_external_note(note_contents[note])])
+
+    return {
+        "totalNotes": total_notes,
+        "ideas": ideas,
+        "pieces": pieces,
+        "connections": total_connections,
+        "externalPieces": external_pieces
+    }
+
+@app.post("/search", response_class=FastJSONResponse)
 def search(req: SearchRequest):
     try:
-        existing_notes = list_obsidian_notes()
-        # Filter to only include notes with "Idea" or "Piece" in the name
-        filtered_notes = [note for note in existing_notes if "Idea" in note or "Piece" in note]
-        results = []
-        # Build note content and connection maps for connection counting
-        note_contents = {}
-        for note in filtered_notes:
-            note_contents[note] = get_note_content(note)
-        for note in filtered_notes:
-            content = note_contents[note]
-            # Remove connections for text search
-            content_without_connections = re.sub(r'\[\[.*?\]\]', '', content)
-            note_type = "idea" if note.startswith("Idea -") else "piece"
-            # Metadata
-            file_path = os.path.join(os.getenv("OBSIDIAN_VAULT_PATH", "."), note)
-            try:
-                stat = os.stat(file_path)
-                created = stat.st_ctime
-                modified = stat.st_mtime
-            except Exception:
-                created = 0.0
-                modified = 0.0
-            word_count = len(content.split())
-            # Count connections (outgoing + incoming)
-            outgoing = content.count('[[')
-            incoming = 0
-            note_name_without_ext = note.replace(".md", "")
-            note_name_without_prefix = note_name_without_ext.replace("Idea - ", "").replace("Piece - ", "")
-            for other_note, other_content in note_contents.items():
-                if other_note != note:
-                    incoming += other_content.count(f'[[{note_name_without_ext}]]')
-                    incoming += other_content.count(f'[[{note_name_without_prefix}]]')
-            num_connections = outgoing + incoming
-            # Text search
-            if req.mode == "text":
-                if req.query.lower() in content_without_connections.lower():
-                    results.append(SearchResult(
-                        name=note.replace("Idea - ", "").replace("Piece - ", "").replace(".md", ""),
-                        content=content_without_connections[:200] + "..." if len(content_without_connections) > 200 else content_without_connections,
-                        type=note_type,
-                        created=created,
-                        modified=modified,
-                        word_count=word_count,
-                        num_connections=num_connections,
-                        external=is_external_note(content)
-                    ))
-            # Prompt search
-            elif req.mode == "prompt":
-                if content_without_connections.strip():
-                    try:
-                        response = client.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", "content": "You are a helpful assistant that rates the associativity of a piece (e.g. an essay) with an essay prompt. Return a JSON object with 'score' (number 0-1) and 'reason' (brief explanation of why it's relevant)."},
-                                {"role": "user", "content": f"Query: {req.query}\nNote content: {content_without_connections[:1000]}\n\nReturn JSON: {{'score': 0.8, 'reason': 'brief explanation'}}"}
-                            ],
-                            max_tokens=100,
-                            temperature=0
-                        )
-                        response_text = response.choices[0].message.content.strip()
-                        try:
-                            # Try to parse JSON response
-                            import json
-                            result_data = json.loads(response_text)
-                            score = float(result_data.get('score', 0))
-                            reason = result_data.get('reason', 'Relevant to query')
-                        except:
-                            # Fallback: try to extract score from text
-                            score = float(response_text.split()[0]) if response_text.split() else 0
-                            reason = "Relevant to query"
-                        
-                        if score > 0.3:
-                            results.append(SearchResult(
-                                name=note.replace("Idea - ", "").replace("Piece - ", "").replace(".md", ""),
-                                content=content_without_connections[:200] + "..." if len(content_without_connections) > 200 else content_without_connections,
-                                type=note_type,
-                                score=score,
-                                reason=reason,
-                                created=created,
-                                modified=modified,
-                                word_count=word_count,
-                                num_connections=num_connections,
-                                external=is_external_note(content)
-                            ))
-                    except Exception as e:
-                        print(f"Error getting similarity for {note}: {e}")
-                        continue
-        # Sort
-        if req.mode == "prompt":
-            results.sort(key=lambda x: x.score, reverse=True)
-        else:
-            results.sort(key=lambda x: x.name.lower())
-        return {"results": results[:10]}
+        for event in search_events(req):
+            if event["type"] == "final":
+                return {"results": event["results"]}
     except Exception as e:
         print("Error in search:", e)
         raise HTTPException(status_code=500, detail=f"Search error: {e}")
 
-@app.post("/search_by_tags")
+@app.post("/search/stream")
+def search_stream(req: SearchRequest, request: Request):
+    # Same as /search, but each SearchResult is sent as soon as it's scored,
+    # with progress events and a final ranked top-10 frame
+    return stream_events(search_events(req), request)
+
+def search_events(req):
+    # The indexes are kept current incrementally; only rescan when they may be stale
+    ensure_vault_indexed()
+    # Text search: ranked lookup in the inverted index, reading only the top hits
+    if req.mode == "text":
+        ranked = text_index.search(req.query, limit=10)
+        note_contents = {fetched.name: fetched.content for fetched in fetch_notes([note for note, _ in ranked])}
+        results = [search_result(note, note_contents[note], score=score) for note, score in ranked]
+        for result in results:
+            yield {"type": "result", "result": result}
+        yield {"type": "final", "results": results}
+        return
+    filtered_notes, note_contents = indexed_vault_notes()
+    total = len(filtered_notes)
+    # Prompt search: nearest notes by embedding, the LLM only explains the top hits
+    try:
+        ranked = embedding_store.search(
+            req.query,
+            {note: strip_links(note_contents[note]) for note in filtered_notes},
+            k=10,
+            min_score=EMBEDDING_MIN_SCORE
+        )
+    except Exception as e:
+        print("Embedding search unavailable, falling back to LLM scoring:", e)
+        ranked = None
+    if ranked is not None:
+        results = [search_result(note, note_contents[note], score=score) for note, score in ranked]
+        for result in results:
+            yield {"type": "result", "result": result}
+        yield {"type": "progress", "done": total, "total": total}
+        if PROMPT_SEARCH_REASONS:
+            reasons = explain_matches(req.query, [note for note, _ in ranked], note_contents)
+            for (note, _), result in zip(ranked, results):
+                result.reason = reasons.get(note, "")
+        yield {"type": "final", "results": results}
+        return
+    # No embeddings: score the notes in batched structured requests instead
+    results = []
+    done = 0
+    notes = [(note, strip_links(note_contents[note])) for note in filtered_notes]
+    for batch_scores, scored in iter_note_scores(req.query, notes):
+        done += scored
+        for note, (score, reason) in batch_scores.items():
+            if score > 0.3:
+                result = search_result(note, note_contents[note], score=score, reason=reason)
+                results.append(result)
+                yield {"type": "result", "result": result}
+        yield {"type": "progress", "done": done, "total": total}
+    # Sort
+    results.sort(key=lambda x: x.score, reverse=True)
+    yield {"type": "final", "results": results[:10]}
+
+def stream_events(events, request):
+    # NDJSON by default, Server-Sent Events if the client asks for text/event-stream.
+    # Errors after the stream has started are sent as an "error" event.
+    def encoded():
+        try:
+            for event in events:
+                yield jsonable_encoder(event)
+        except Exception as e:
+            print("Error while streaming:", e)
+            yield {"type": "error", "detail": str(e)}
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        body = (b"event: " + event["type"].encode() + b"\ndata: " + json_dumps(event) + b"\n\n" for event in encoded())
+        return StreamingResponse(body, media_type="text/event-stream")
+    body = (json_dumps(event) + b"\n" for event in encoded())
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def token_batches(items, budget):
+    # Group (note, text) pairs so each group's text fits in roughly `budget` tokens
+    batch = []
+    used = 0
+    for note, text in items:
+        cost = estimate_tokens(text) + 8
+        if batch and used + cost > budget:
+            yield batch
+            batch = []
+            used = 0
+        batch.append((note, text))
+        used += cost
+    if batch:
+        yield batch
+
+def iter_note_scores(query, notes):
+    # Yields ({note: (score, reason)}, notes scored) as batches finish. Each
+    # (query, note) score is cached on its own, so only unscored notes are
+    # sent, and the batches run in parallel on the OpenAI executor.
+    cached_scores = {}
+    unscored = []
+    for note, text in notes:
+        text = text[:1000]
+        if not text.strip():
+            continue
+        hit, score = openai_executor.cached(openai_executor.key("gpt-4o-mini", [query, text]))
+        if hit:
+            cached_scores[note] = score
+        else:
+            unscored.append((note, text))
+    if cached_scores:
+        yield cached_scores, len(cached_scores)
+    batches = {
+        openai_executor.pool.submit(score_batch, query, batch): len(batch)
+        for batch in token_batches(unscored, PROMPT_SCORING_TOKEN_BUDGET)
+    }
+    for future in as_completed(batches):
+        yield future.result(), batches[future]
+
+def score_batch(query, batch):
+    listing = "\n\n".join(f"[{i}]\n{text}" for i, (_, text) in enumerate(batch))
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant that rates the associativity of pieces (e.g. essays) with an essay prompt. Each note is given with a numeric id in brackets. For every note return its id, a 'score' (number 0-1) and a 'reason' (brief explanation of why it's relevant)."},
+        {"role": "user", "content": f"Query: {query}\n\nNotes:\n{listing}"},
+    ]
+    try:
+        response = openai_executor.call(
+            "gpt-4o-mini",
+            messages,
+            lambda: client.responses.parse(model="gpt-4o-mini", input=messages, text_format=NoteScores),
+            tokens=estimate_tokens(listing) + 60 * len(batch)
+        )
+    except Exception as e:
+        print(f"Error scoring a batch of {len(batch)} notes: {e}")
+        return {}
+    scores = {}
+    for item in response.output_parsed.scores:
+        if 0 <= item.id < len(batch):
+            note, text = batch[item.id]
+            scores[note] = (item.score, item.reason)
+            openai_executor.remember(openai_executor.key("gpt-4o-mini", [query, text]), scores[note])
+    return scores
+
+def explain_matches(query, notes, note_contents):
+    # One structured call that writes a short reason for each matched note
+    if not notes:
+        return {}
+    listing = "\n\n".join(f"Note: {note}\n{strip_links(note_contents[note])[:1000]}" for note in notes)
+    messages = [
+        {"role": "system", "content": "You explain why pieces (e.g. essays) relate to an essay prompt. For every note given, return its exact note name and one brief sentence on why it's relevant to the query."},
+        {"role": "user", "content": f"Query: {query}\n\n{listing}"},
+    ]
+    try:
+        response = openai_executor.call(
+            "gpt-4o-mini",
+            messages,
+            lambda: client.responses.parse(model="gpt-4o-mini", input=messages, text_format=MatchReasons),
+            tokens=estimate_tokens(listing) + 40 * len(notes)
+        )
+        return {match.name: match.reason for match in response.output_parsed.reasons}
+    except Exception as e:
+        print("Error explaining search results:", e)
+        return {}
+
+@app.post("/search_by_tags", response_class=FastJSONResponse)
 def search_by_tags(req: TagSearchRequest):
     try:
-        existing_notes = list_obsidian_notes()
-        # Filter to only include notes with "Idea" or "Piece" in the name
-        filtered_notes = [note for note in existing_notes if "Idea" in note or "Piece" in note]
+        if req.expression:
+            tree = parse_tag_expression(req.expression)
+        elif req.tags:
+            tree = ("or", [("tag", tag) for tag in req.tags])
+        else:
+            return {"results": [], "facets": {}}
+    except TagExpressionError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tag expression: {e}")
+
+    try:
+        ensure_vault_indexed()
+        wanted = expression_tags(tree)
+        matched = sorted(tag_index.evaluate(tree))
         results = []
-        
-        for note in filtered_notes:
+        for note in matched:
             content = get_note_content(note)
-            note_type = "idea" if note.startswith("Idea -") else "piece"
-            
-            # Extract tags from the first line
-            lines = content.splitlines()
-            note_tags = set()
-            if lines and lines[0].startswith('#'):
-                first_line = lines[0]
-                tag_matches = re.findall(r'#([^#\s]+)', first_line)
-                note_tags = set(tag_matches)
-            
-            # Check if any of the requested tags are in this note's tags
-            matching_tags = note_tags.intersection(set(req.tags))
-            if matching_tags:
-                # Metadata
-                file_path = os.path.join(os.getenv("OBSIDIAN_VAULT_PATH", "."), note)
-                try:
-                    stat = os.stat(file_path)
-                    created = stat.st_ctime
-                    modified = stat.st_mtime
-                except Exception:
-                    created = 0.0
-                    modified = 0.0
-                
-                word_count = len(content.split())
-                
-                # Count connections
-                outgoing = content.count('[[')
-                incoming = 0
-                note_name_without_ext = note.replace(".md", "")
-                note_name_without_prefix = note_name_without_ext.replace("Idea - ", "").replace("Piece - ", "")
-                
-                for other_note in filtered_notes:
-                    if other_note != note:
-                        other_content = get_note_content(other_note)
-                        incoming += other_content.count(f'[[{note_name_without_ext}]]')
-                        incoming += other_content.count(f'[[{note_name_without_prefix}]]')
-                
-                num_connections = outgoing + incoming
-                
-                results.append(SearchResult(
-                    name=note.replace("Idea - ", "").replace("Piece - ", "").replace(".md", ""),
-                    content=content[:200] + "..." if len(content) > 200 else content,
-                    type=note_type,
-                    score=len(matching_tags),  # Score based on number of matching tags
-                    reason=f"Contains tags: {', '.join(matching_tags)}",
-                    created=created,
-                    modified=modified,
-                    word_count=word_count,
-                    num_connections=num_connections,
-                    external=is_external_note(content)
-                ))
-        
+            matching_tags = sorted(tag_index.tags(note) & wanted)
+            results.append(search_result(
+                note,
+                content,
+                preview=content,
+                score=len(matching_tags),  # Score based on number of matching tags
+                reason=f"Contains tags: {', '.join(matching_tags)}"
+            ))
+
         # Sort by score (number of matching tags) descending
         results.sort(key=lambda x: x.score, reverse=True)
-        return {"results": results}
-        
+        facets = dict(tag_index.facets(matched).most_common())
+        return {"results": results, "facets": facets}
+
     except Exception as e:
         print("Error in tag search:", e)
         raise HTTPException(status_code=500, detail=f"Tag search error: {e}")
 
 @app.post("/batch_tag")
 def batch_tag(req: BatchTagRequest):
-    logger.debug(f"Checking for file")
+    logger.debug(f"Tagging {len(req.note_names)} notes")
 
     try:
-        for note_name in req.note_names:
-            # Determine full note file name
-            for prefix in ["Idea - ", "Piece - "]:
-                file_name = f"{prefix}{note_name}.md"
-                file_path = os.path.join(os.getenv("OBSIDIAN_VAULT_PATH", "."), file_name)
-
-                if os.path.exists(file_path):
-                    break
-            else:
-                continue  # skip if not found
-
-            content = get_note_content(file_name)
-            lines = content.splitlines()
-            
-            # Extract existing tags from the first line
-            existing_tags = set()
-            if lines and lines[0].startswith('#'):
-                # Parse existing tags from the first line
-                first_line = lines[0]
-                # Extract hashtags using regex - capture everything after # until next # or end
-                existing_tag_matches = re.findall(r'#([^#\s]+)', first_line)
-                existing_tags = set(existing_tag_matches)
-                # Remove the first line since we'll recreate it
-                lines = lines[1:]
-            
-            # Combine existing tags with new tags, avoiding duplicates
-            all_tags = existing_tags.union(set(req.tags))
-            
-            # Create new tag line - handle spaces by wrapping in quotes if needed
-            tag_line = ' '.join(f'#{tag}' for tag in sorted(all_tags))
-            
-            # Reconstruct content with preserved tags
-            new_content = tag_line + '\n' + '\n'.join(lines)
-            
-            # Save back
-            url = f"{OBSIDIAN_HOST}/vault/{file_name}"
-            headers = {
-                "Authorization": f"Bearer {OBSIDIAN_API_KEY}",
-                "Content-Type": "text/markdown",
-                "accept": "*/*"
-            }
-            resp = requests.put(url, data=new_content, headers=headers, verify=False)
-            if not resp.ok:
-                print(f"Failed to update tags for {file_name}: {resp.text}")
-        return {"status": "tags updated"}
+        resolved = resolve_note_names(req.note_names)
+        futures = {
+            name: tag_write_pool.submit(tag_note, note, req.tags)
+            for name, note in resolved.items() if note is not None
+        }
+        results = []
+        for name in req.note_names:
+            note = resolved.get(name)
+            if note is None:
+                results.append({"name": name, "status": "not_found"})
+                continue
+            status, error = futures[name].result()
+            result = {"name": name, "note": note, "status": status}
+            if error:
+                result["error"] = error
+            results.append(result)
+        if any(result["status"] == "updated" for result in results):
+            summary_prewarm_requested.set()
+        return {"status": "tags updated", "results": results}
     except Exception as e:
         print("Error in batch_tag:", e)
         raise HTTPException(status_code=500, detail=f"Batch tag error: {e}")
 
+def resolve_note_names(names):
+    # Bare note names ("Robotics") -> vault notes ("Idea - Robotics.md"), looked
+    # up in the indexed note set the watcher and our writes keep current.
+    # "Idea - " wins over "Piece - ".
+    ensure_vault_indexed()
+    with vault_state_lock:
+        listed = set(vault_notes)
+    resolved = {}
+    for name in names:
+        resolved[name] = None
+        if name in listed:
+            resolved[name] = name
+            continue
+        for prefix in ["Idea - ", "Piece - "]:
+            file_name = f"{prefix}{name}.md"
+            if file_name in listed:
+                resolved[name] = file_name
+                break
+    return resolved
+
+def apply_tags(content, tags):
+    # Merge tags into the note's first-line tag line. Returns content itself
+    # when it already has every tag, so re-tagging never rewrites the note;
+    # otherwise the body, its line endings and trailing newline are kept as is.
+    existing_tags = parse_tags(content)
+    if set(tags) <= existing_tags:
+        return content
+    body = content
+    if existing_tags:
+        # Drop the old tag line since we'll recreate it
+        _, _, body = content.partition('\n')
+    newline = '\r\n' if '\r\n' in content else '\n'
+
+    # Combine existing tags with new tags, avoiding duplicates
+    all_tags = existing_tags.union(set(tags))
+    tag_line = ' '.join(f'#{tag}' for tag in sorted(all_tags))
+    return tag_line + newline + body
+
+def tag_note(note, tags):
+    # Returns (status, error); the note is only written if its tags change
+    with note_lock(note):
+        # Read fresh, so edits made outside the app aren't overwritten with a cached copy
+        note_cache.invalidate(note_path(note))
+        try:
+            content = read_note(note).content
+        except Exception as e:
+            print(f"Failed to read {note} for tagging: {e}")
+            return "error", str(e)
+        new_content = apply_tags(content, tags)
+        if new_content == content:
+            return "unchanged", None
+        try:
+            vault.write_note(note_path(note), new_content)
+        except Exception as e:
+            print(f"Failed to update tags for {note}: {e}")
+            return "error", str(e)
+        finally:
+            note_cache.invalidate(note_path(note))
+        index_note(note, new_content)
+        return "updated", None
+
 # --- Prompts Management ---
+# Prompts (with their drafts), idea boards and folders live in one document
+# store. The JSON files they used to live in are imported on first start.
 PROMPTS_FILE = "prompts.json"
+IDEA_BOARDS_FILE = "idea_boards.json"
+FOLDERS_FILE = "folders.json"
+STORE_FILES = {"prompts": PROMPTS_FILE, "idea_boards": IDEA_BOARDS_FILE, "folders": FOLDERS_FILE}
+STORE_BACKEND = os.getenv("STORE_BACKEND", "sqlite")
+STORE_FILE = data_file("STORE_FILE", "friday.db")
+
+def legacy_paths(file_name):
+    # The old files were resolved relative to the CWD; also look next to main.py
+    return list(dict.fromkeys([os.path.abspath(file_name), os.path.join(BASE_DIR, file_name)]))
+
+if STORE_BACKEND == "json":
+    # Keep the JSON files: loaded once, written behind in the background
+    store = JsonDocumentStore(
+        {
+            collection: next((path for path in legacy_paths(file_name) if os.path.exists(path)),
+                             os.path.join(BASE_DIR, file_name))
+            for collection, file_name in STORE_FILES.items()
+        },
+        flush_delay=float(os.getenv("STORE_FLUSH_DELAY", "0.5"))
+    )
+else:
+    store = SqliteStore(STORE_FILE)
+    for collection, file_name in STORE_FILES.items():
+        try:
+            imported = store.migrate(collection, legacy_paths(file_name))
+            if imported:
+                logger.debug(f"Imported {imported} {collection} from {file_name}")
+        except Exception as e:
+            print(f"Error importing {file_name}: {e}")
+
+# Idea-board patches are logged and folded into the stored boards in the background
+board_ops = BoardOpLog(
+    data_file("BOARD_OPS_FILE", "board_ops.db"),
+    store,
+    compact_interval=float(os.getenv("BOARD_COMPACT_INTERVAL", "30")),
+    compact_threshold=int(os.getenv("BOARD_COMPACT_THRESHOLD", "200"))
+)
 
-def load_prompts():
-    try:
-        if os.path.exists(PROMPTS_FILE):
-            with open(PROMPTS_FILE, 'r') as f:
-                data = json.load(f)
-                # Handle both old format (list) and new format (dict with prompts key)
-                if isinstance(data, list):
-                    return data
-                elif isinstance(data, dict) and "prompts" in data:
-                    return data["prompts"]
-                else:
-                    return []
-        return []
-    except Exception as e:
-        print(f"Error loading prompts: {e}")
-        return []
+@app.on_event("startup")
+def start_board_compactor():
+    board_ops.start()
 
-def save_prompts(prompts):
-    try:
-        # Save in new format with prompts key
-        data = {"prompts": prompts}
-        with open(PROMPTS_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"Error saving prompts: {e}")
-        raise HTTPException(status_code=500, detail=f"Error saving prompts: {e}")
+@app.on_event("shutdown")
+def close_store():
+    board_ops.close()
+    store.close()
 
 @app.get("/prompts")
-def get_prompts():
-    prompts = load_prompts()
-    return {"prompts": prompts}
+def get_prompts(request: Request):
+    try:
+        return versioned_response(
+            request, "prompts", lambda: store.version("prompts"), lambda: {"prompts": store.list("prompts")}
+        )
+    except Exception as e:
+        print(f"Error loading prompts: {e}")
+        return {"prompts": []}
 
 @app.post("/prompts")
 def create_prompt(prompt: dict):
     try:
-        # Load existing prompts
-        try:
-            with open("prompts.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            data = {"prompts": []}
- 
         # Create new prompt with ID
         new_prompt = {
             "id": str(uuid.uuid4()),
@@ -482,53 +832,22 @@ def create_prompt(prompt: dict):
             "drafts": [],
             "folder": prompt.get("folder", "")
         }
- 
-        data.append(new_prompt)
-        
-        # Save back to file
-        with open("prompts.json", "w") as f:
-            json.dump(data, f, indent=2)
-        
+        store.insert("prompts", new_prompt)
         return {"message": "Prompt created successfully", "prompt": new_prompt}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/prompts/{prompt_id}")
 def update_prompt(prompt_id: str, update_data: dict):
-    try:
-        # Load existing prompts
-        try:
-            with open("prompts.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        # Find and update prompt
-        prompts = data
-        prompt_to_update = None
-        for prompt in prompts:
-            if prompt["id"] == prompt_id:
-                prompt_to_update = prompt
-                break
-        
-        if not prompt_to_update:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        
+    def change(prompt):
         # Update fields
-        if "backed_up" in update_data:
-            prompt_to_update["backed_up"] = update_data["backed_up"]
-        if "note_name" in update_data:
-            prompt_to_update["note_name"] = update_data["note_name"]
-        if "folder" in update_data:
-            if not prompt_to_update.get("folder"):
-                prompt_to_update["folder"] = {}
-
-            prompt_to_update["folder"] = update_data["folder"]
-        
+        for field in ("backed_up", "note_name", "folder"):
+            if field in update_data:
+                prompt[field] = update_data[field]
 
-        # Save back to file
-        with open("prompts.json", "w") as f:
-            json.dump(data, f, indent=2)
-        
+    try:
+        if store.update("prompts", prompt_id, change) is None:
+            raise HTTPException(status_code=404, detail="Prompt not found")
         return {"message": "Prompt updated successfully"}
     except HTTPException:
         raise
@@ -538,31 +857,8 @@ def update_prompt(prompt_id: str, update_data: dict):
 @app.delete("/prompts/{prompt_id}")
 def delete_prompt(prompt_id: str):
     try:
-        # Load existing prompts
-        try:
-            with open("prompts.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        
-        # Find and remove prompt
-        prompts = data.get("prompts", [])
-        prompt_to_delete = None
-        for prompt in prompts:
-            if prompt["id"] == prompt_id:
-                prompt_to_delete = prompt
-                break
-        
-        if not prompt_to_delete:
+        if not store.delete("prompts", prompt_id):
             raise HTTPException(status_code=404, detail="Prompt not found")
-        
-        prompts.remove(prompt_to_delete)
-        data["prompts"] = prompts
-        
-        # Save back to file
-        with open("prompts.json", "w") as f:
-            json.dump(data, f, indent=2)
-        
         return {"message": "Prompt deleted successfully"}
     except HTTPException:
         raise
@@ -571,51 +867,21 @@ def delete_prompt(prompt_id: str):
 
 @app.post("/prompts/{prompt_id}/drafts")
 def create_draft(prompt_id: str, req: DraftRequest):
+    new_draft = {
+        "id": str(uuid.uuid4()),
+        "title": req.title,
+        "link": "",
+        "backed_up": False,
+        "note_name": ""
+    }
+
+    def change(prompt):
+        new_draft["link"] = prompt.get("essay_link", "")  # Use the prompt's essay_link
+        prompt.setdefault("drafts", []).append(new_draft)
+
     try:
-        # Load existing prompts
-        try:
-            with open("prompts.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        
-        # Handle both old format (list) and new format (dict with prompts key)
-        if isinstance(data, list):
-            prompts = data
-        elif isinstance(data, dict) and "prompts" in data:
-            prompts = data["prompts"]
-        else:
-            prompts = []
-        
-        # Find prompt and add draft
-        prompt_found = False
-        for prompt in prompts:
-            if prompt["id"] == prompt_id:
-                new_draft = {
-                    "id": str(uuid.uuid4()),
-                    "title": req.title,
-                    "link": prompt.get("essay_link", ""),  # Use the prompt's essay_link
-                    "backed_up": False,
-                    "note_name": ""
-                }
-                prompt["drafts"].append(new_draft)
-                prompt_found = True
-                break
-        
-        if not prompt_found:
+        if store.update("prompts", prompt_id, change) is None:
             raise HTTPException(status_code=404, detail="Prompt not found")
-        
-        # Save back to file - maintain the same format
-        if isinstance(data, list):
-            # Save as list directly
-            with open("prompts.json", "w") as f:
-                json.dump(prompts, f, indent=2)
-        else:
-            # Save with prompts key
-            data["prompts"] = prompts
-            with open("prompts.json", "w") as f:
-                json.dump(data, f, indent=2)
-        
         return {"draft": new_draft}
     except HTTPException:
         raise
@@ -626,49 +892,17 @@ def create_draft(prompt_id: str, req: DraftRequest):
 
 @app.put("/prompts/{prompt_id}/drafts/{draft_id}")
 def update_draft(prompt_id: str, draft_id: str, req: PromptUpdateRequest):
+    def change(prompt):
+        for draft in prompt.get("drafts", []):
+            if draft["id"] == draft_id:
+                draft["backed_up"] = req.backed_up
+                draft["note_name"] = req.note_name
+                return
+        raise HTTPException(status_code=404, detail="Draft not found")
+
     try:
-        # Load existing prompts
-        try:
-            with open("prompts.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        
-        # Handle both old format (list) and new format (dict with prompts key)
-        if isinstance(data, list):
-            prompts = data
-        elif isinstance(data, dict) and "prompts" in data:
-            prompts = data["prompts"]
-        else:
-            prompts = []
-        
-        # Find prompt and update draft
-        draft_found = False
-        for prompt in prompts:
-            if prompt["id"] == prompt_id:
-                for draft in prompt["drafts"]:
-                    if draft["id"] == draft_id:
-                        draft["backed_up"] = req.backed_up
-                        draft["note_name"] = req.note_name
-                        draft_found = True
-                        break
-                if draft_found:
-                    break
-        
-        if not draft_found:
+        if store.update("prompts", prompt_id, change) is None:
             raise HTTPException(status_code=404, detail="Draft not found")
-        
-        # Save back to file - maintain the same format
-        if isinstance(data, list):
-            # Save as list directly
-            with open("prompts.json", "w") as f:
-                json.dump(prompts, f, indent=2)
-        else:
-            # Save with prompts key
-            data["prompts"] = prompts
-            with open("prompts.json", "w") as f:
-                json.dump(data, f, indent=2)
-        
         return {"message": "Draft updated successfully"}
     except HTTPException:
         raise
@@ -677,46 +911,16 @@ def update_draft(prompt_id: str, draft_id: str, req: PromptUpdateRequest):
 
 @app.delete("/prompts/{prompt_id}/drafts/{draft_id}")
 def delete_draft(prompt_id: str, draft_id: str):
+    def change(prompt):
+        drafts = prompt.get("drafts", [])
+        remaining = [d for d in drafts if d["id"] != draft_id]
+        if len(remaining) == len(drafts):
+            raise HTTPException(status_code=404, detail="Draft not found")
+        prompt["drafts"] = remaining
+
     try:
-        # Load existing prompts
-        try:
-            with open("prompts.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        
-        # Handle both old format (list) and new format (dict with prompts key)
-        if isinstance(data, list):
-            prompts = data
-        elif isinstance(data, dict) and "prompts" in data:
-            prompts = data["prompts"]
-        else:
-            prompts = []
-        
-        # Find prompt and remove draft
-        draft_found = False
-        for prompt in prompts:
-            if prompt["id"] == prompt_id:
-                original_length = len(prompt["drafts"])
-                prompt["drafts"] = [d for d in prompt["drafts"] if d["id"] != draft_id]
-                if len(prompt["drafts"]) < original_length:
-                    draft_found = True
-                break
-        
-        if not draft_found:
+        if store.update("prompts", prompt_id, change) is None:
             raise HTTPException(status_code=404, detail="Draft not found")
-        
-        # Save back to file - maintain the same format
-        if isinstance(data, list):
-            # Save as list directly
-            with open("prompts.json", "w") as f:
-                json.dump(prompts, f, indent=2)
-        else:
-            # Save with prompts key
-            data["prompts"] = prompts
-            with open("prompts.json", "w") as f:
-                json.dump(data, f, indent=2)
-        
         return {"message": "Draft deleted successfully"}
     except HTTPException:
         raise
@@ -724,33 +928,16 @@ def delete_draft(prompt_id: str, draft_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- Idea Boards Management ---
-IDEA_BOARDS_FILE = "idea_boards.json"
-
-def load_idea_boards():
+@app.get("/idea_boards")
+def get_idea_boards(request: Request):
     try:
-        if os.path.exists(IDEA_BOARDS_FILE):
-            with open(IDEA_BOARDS_FILE, 'r') as f:
-                return json.load(f)
-        return []
+        return versioned_response(request, "idea_boards", board_ops.version, lambda: {"boards": board_ops.list()})
     except Exception as e:
         print(f"Error loading idea boards: {e}")
-        return []
-
-def save_idea_boards(boards):
-    try:
-        with open(IDEA_BOARDS_FILE, 'w') as f:
-            json.dump(boards, f, indent=2)
-    except Exception as e:
-        print(f"Error saving idea boards: {e}")
-        raise HTTPException(status_code=500, detail=f"Error saving idea boards: {e}")
-
-@app.get("/idea_boards")
-def get_idea_boards():
-    return {"boards": load_idea_boards()}
+        return {"boards": []}
 
 @app.post("/idea_boards")
 def create_idea_board(req: IdeaBoardRequest):
-    boards = load_idea_boards()
     new_board = {
         "id": str(uuid.uuid4()),
         "name": req.name,
@@ -760,68 +947,79 @@ def create_idea_board(req: IdeaBoardRequest):
         "created": datetime.now().timestamp(),
         "modified": datetime.now().timestamp()
     }
-    boards.append(new_board)
-    save_idea_boards(boards)
+    try:
+        store.insert("idea_boards", new_board)
+    except Exception as e:
+        print(f"Error saving idea boards: {e}")
+        raise HTTPException(status_code=500, detail=f"Error saving idea boards: {e}")
     return {"board": new_board}
 
 @app.put("/idea_boards/{board_id}")
 def update_idea_board(board_id: str, req: IdeaBoardUpdateRequest):
-    boards = load_idea_boards()
-    for i, board in enumerate(boards):
-        if board["id"] == board_id:
-            boards[i] = {
-                "id": board_id,
-                "name": req.name,
-                "description": req.description,
-                "nodes": req.nodes,
-                "edges": req.edges,
-                "created": req.created,
-                "modified": req.modified
-            }
-            save_idea_boards(boards)
-            return {"board": boards[i]}
-    raise HTTPException(status_code=404, detail="Board not found")
+    board = {
+        "id": board_id,
+        "name": req.name,
+        "description": req.description,
+        "nodes": req.nodes,
+        "edges": req.edges,
+        "created": req.created,
+        "modified": req.modified
+    }
+    try:
+        replaced = board_ops.replace(board)
+    except Exception as e:
+        print(f"Error saving idea boards: {e}")
+        raise HTTPException(status_code=500, detail=f"Error saving idea boards: {e}")
+    if not replaced:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return {"board": board}
+
+@app.patch("/idea_boards/{board_id}")
+def patch_idea_board(board_id: str, req: IdeaBoardPatchRequest):
+    # Apply add/move/update/remove ops to one board. base_modified must match
+    # the board's current "modified", otherwise nothing is applied (409).
+    modified = req.modified if req.modified is not None else datetime.now().timestamp()
+    if modified == req.base_modified:
+        modified += 0.001
+    try:
+        board = board_ops.patch(board_id, req.base_modified, jsonable_encoder(req.ops, exclude_none=True), modified)
+    except BoardConflict as e:
+        raise HTTPException(status_code=409, detail={"message": "Board was modified", "board": e.board})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error saving idea boards: {e}")
+        raise HTTPException(status_code=500, detail=f"Error saving idea boards: {e}")
+    if board is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return {"board": board}
 
 @app.delete("/idea_boards/{board_id}")
 def delete_idea_board(board_id: str):
-    boards = load_idea_boards()
-    boards = [board for board in boards if board["id"] != board_id]
-    save_idea_boards(boards)
+    try:
+        board_ops.delete(board_id)
+    except Exception as e:
+        print(f"Error saving idea boards: {e}")
+        raise HTTPException(status_code=500, detail=f"Error saving idea boards: {e}")
     return {"status": "board deleted"}
 
 # Folder management
 @app.get("/folders")
-def get_folders():
-    try:
-        with open("folders.json", "r") as f:
-            data = json.load(f)
-        return {"folders": data.get("folders", [])}
-    except FileNotFoundError:
-        return {"folders": []}
+def get_folders(request: Request):
+    return versioned_response(
+        request, "folders", lambda: store.version("folders"), lambda: {"folders": store.list("folders")}
+    )
 
 @app.post("/folders")
 def create_folder(folder: dict):
     try:
-        # Load existing folders
-        try:
-            with open("folders.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            data = {"folders": []}
-        
         # Create new folder with ID
         new_folder = {
             "id": str(uuid.uuid4()),
             "name": folder["name"],
             "color": folder["color"]
         }
-        
-        data["folders"].append(new_folder)
-        
-        # Save back to file
-        with open("folders.json", "w") as f:
-            json.dump(data, f, indent=2)
-        
+        store.insert("folders", new_folder)
         return {"message": "Folder created successfully", "folder": new_folder}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -829,31 +1027,8 @@ def create_folder(folder: dict):
 @app.delete("/folders/{folder_id}")
 def delete_folder(folder_id: str):
     try:
-        # Load existing folders
-        try:
-            with open("folders.json", "r") as f:
-                data = json.load(f)
-        except FileNotFoundError:
+        if not store.delete("folders", folder_id):
             raise HTTPException(status_code=404, detail="Folder not found")
-        
-        # Find and remove folder
-        folders = data.get("folders", [])
-        folder_to_delete = None
-        for folder in folders:
-            if folder["id"] == folder_id:
-                folder_to_delete = folder
-                break
-        
-        if not folder_to_delete:
-            raise HTTPException(status_code=404, detail="Folder not found")
-        
-        folders.remove(folder_to_delete)
-        data["folders"] = folders
-        
-        # Save back to file
-        with open("folders.json", "w") as f:
-            json.dump(data, f, indent=2)
-        
         return {"message": "Folder deleted successfully"}
     except HTTPException:
         raise
@@ -861,191 +1036,504 @@ def delete_folder(folder_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- Helper functions ---
-def create_obsidian_note(note_type, content, custom_note_name=""):
-    # Use Local REST API (PUT /vault/{note_name}) to create a new note
+def obsidian_note_name(note_type, content, custom_note_name=""):
     if custom_note_name:
         # Use the custom note name with prefix
-        note_name = f"UndergraduateAdmission/{note_type.title()} - {custom_note_name}.md"
-    else:
-        # Fallback to auto-generated name
-        note_name = f"UndergraduateAdmission/{note_type.title()} - {content[:30].replace(' ', '_')}.md"
-    url = f"{OBSIDIAN_HOST}/vault/{note_name}"
-    headers = {
-        "Authorization": f"Bearer {OBSIDIAN_API_KEY}",
-        "Content-Type": "text/markdown",
-        "accept": "*/*"
-    }
+        return f"UndergraduateAdmission/{note_type.title()} - {custom_note_name}.md"
+    # Fallback to auto-generated name
+    return f"UndergraduateAdmission/{note_type.title()} - {content[:30].replace(' ', '_')}.md"
+
+def create_obsidian_note(note_type, content, custom_note_name=""):
+    # Write the new note through the vault backend
+    note_name = obsidian_note_name(note_type, content, custom_note_name)
     try:
-        resp = requests.put(url, data=content, headers=headers, verify=False)
-        if not resp.ok:
-            print(f"Obsidian Local REST API error (create_obsidian_note): {resp.text}")
-            raise Exception(f"Obsidian Local REST API error: {resp.text}")
+        vault.write_note(note_name, content)
+        note_cache.invalidate(note_name)
+        index_note(note_key(note_name), content)
         return note_name
     except Exception as e:
         print(f"Exception in create_obsidian_note: {e}")
         raise HTTPException(status_code=500, detail=f"Obsidian Local REST API error: {e}")
 
 def list_obsidian_notes():
-    # Use Local REST API (GET /vault/) to list files in vault
-    url = f"{OBSIDIAN_HOST}/vault/UndergraduateAdmission/"
-    headers = {
-        "Authorization": f"Bearer {OBSIDIAN_API_KEY}",
-        "accept": "application/json"
-    }
+    # List files in the "UndergraduateAdmission" directory of the vault
     try:
-        resp = requests.get(url, headers=headers, verify=False)
-        if not resp.ok:
-            raise Exception(f"Obsidian Local REST API error: {resp.text}")
-        
-        all_files = resp.json().get("files", [])
-        # Filter to only include files in the "UndergraduateAdmission" directory
-        undergraduate_files = all_files
-        # Remove the "UndergraduateAdmission/" prefix from file names
-        root_files = [file.replace("UndergraduateAdmission/", "") for file in undergraduate_files]
-
-        return root_files
+        return vault.list_notes("UndergraduateAdmission")
     except Exception as e:
         print(e)
         return []
 
-def get_note_content(note_name):
-    # Fetch the content of a note from Obsidian
+def note_path(note_name):
     # Add "UndergraduateAdmission/" prefix if not already present
     if not note_name.startswith("UndergraduateAdmission/"):
-        note_name = f"UndergraduateAdmission/{note_name}"
-    
-    url = f"{OBSIDIAN_HOST}/vault/{note_name}"
-    headers = {
-        "Authorization": f"Bearer {OBSIDIAN_API_KEY}",
-        "accept": "text/markdown"
-    }
+        return f"UndergraduateAdmission/{note_name}"
+    return note_name
+
+def note_key(note_name):
+    # Name of the note inside the UndergraduateAdmission folder, as listed by the vault
+    if note_name.startswith("UndergraduateAdmission/"):
+        return note_name[len("UndergraduateAdmission/"):]
+    return note_name
+
+class FetchedNote(NamedTuple):
+    name: str
+    content: str
+    digest: Optional[str] = None
+    error: Optional[str] = None
+
+def read_note(note_name):
+    # Serve from the note cache; only go to Obsidian on a miss
+    note_name = note_path(note_name)
+    cached = note_cache.get(note_name)
+    if cached is not None:
+        return cached
+    signature = note_cache.signature(note_name)
+    content = fetch_note_content(note_name)
+    return note_cache.put(note_name, content, signature)
+
+def get_note_content(note_name):
     try:
-        resp = requests.get(url, headers=headers, verify=False)
-        if not resp.ok:
-            print(f"Obsidian Local REST API error (get_note_content) for {note_name}:", resp.text)
-            return ""
-        return resp.text
+        return read_note(note_name).content
     except Exception as e:
         print(f"Exception in get_note_content for {note_name}:", e)
         return ""
 
-def summarize_note_with_ollama(note_content):
-    # Use Ollama's Llama2 model to summarize note content
-    prompt = f"Summarize the following note in 3-4 sentences:\n\n{note_content}"
+def fetch_note(note_name):
     try:
-        response = ollama.generate(model='llama3.2:latest', prompt=prompt)
-        return response['response'].strip()
+        entry = read_note(note_name)
+        return FetchedNote(note_name, entry.content, entry.digest)
     except Exception as e:
+        return FetchedNote(note_name, "", error=str(e))
+
+def fetch_notes(note_names):
+    # Fetch many notes concurrently (bounded by NOTE_FETCH_WORKERS).
+    # Results come back in the order of note_names; a failed note carries its
+    # error instead of aborting the batch.
+    note_names = list(note_names)
+    if len(note_names) <= 1:
+        return [fetch_note(name) for name in note_names]
+    return list(note_fetch_pool.map(fetch_note, note_names))
+
+def fetch_notes_as_completed(note_names):
+    # Like fetch_notes, but yields each FetchedNote as soon as it's ready
+    futures = [note_fetch_pool.submit(fetch_note, name) for name in note_names]
+    for future in as_completed(futures):
+        yield future.result()
+
+def load_vault_notes():
+    # List the Idea/Piece notes, fetch their contents and keep the link graph in sync
+    existing_notes = list_obsidian_notes()
+    # Filter to only include notes with "Idea" or "Piece" in the name
+    filtered_notes = [note for note in existing_notes if "Idea" in note or "Piece" in note]
+    global vault_notes, vault_scanned_at
+    with vault_state_lock:
+        listing_changed = list(vault_notes) != filtered_notes
+        vault_notes = dict.fromkeys(filtered_notes)
+    if listing_changed:
+        vault_changed()
+    note_contents = read_vault_notes(filtered_notes)
+    retain_notes(filtered_notes)
+    vault_scanned_at = time.monotonic()
+    return filtered_notes, note_contents
+
+def read_vault_notes(notes):
+    # Contents of the given notes (note cache first), re-indexing any that changed
+    note_contents = {}
+    for fetched in fetch_notes(notes):
+        note_contents[fetched.name] = fetched.content
+        if fetched.error:
+            print(f"Exception in get_note_content for {fetched.name}:", fetched.error)
+            continue
+        index_note(fetched.name, fetched.content, fetched.digest)
+    return note_contents
+
+def indexed_vault_notes():
+    # Like load_vault_notes, but from the last listing instead of a new one.
+    # Call ensure_vault_indexed first; with a warm note cache this does no upstream I/O.
+    with vault_state_lock:
+        notes = list(vault_notes)
+    return notes, read_vault_notes(notes)
+
+def vault_index_fresh():
+    # The indexes are trusted while a watcher keeps them in step with outside
+    # edits, or until the last scan is VAULT_RESCAN_INTERVAL old
+    if vault_scanned_at is None:
+        return False
+    return vault_watcher is not None or time.monotonic() - vault_scanned_at < VAULT_RESCAN_INTERVAL
+
+def ensure_vault_indexed():
+    # Rescan the vault if the indexes have never been built, or may be stale
+    # because no watcher is keeping them in step with outside edits
+    if not vault_index_fresh():
+        load_vault_notes()
+
+def vault_changed():
+    global vault_version
+    with vault_state_lock:
+        vault_version += 1
+
+def versioned_response(request, name, version, build):
+    # Serve a read endpoint by the version of the data behind it: 304 when the
+    # client's If-None-Match is current, else the body cached for this version
+    # (already compressed the way the client accepts), else build() it. A body
+    # built while the version moved is sent untagged and isn't cached.
+    current = version()
+    headers = {"ETag": f'W/"{name}-{RESPONSE_EPOCH}-{current}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    entry = response_cache.get(name, current)
+    if entry is None:
+        body = json_dumps(build())
+        if version() != current:
+            return Response(body, media_type="application/json")
+        entry = response_cache.put(name, current, body)
+    encoding = accepted_encoding(request.headers.get("accept-encoding")) if len(entry.body) >= COMPRESS_MIN_SIZE else None
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(entry.encoded(encoding), media_type="application/json", headers=headers)
+
+def vault_response(request, name, build):
+    # versioned_response for data derived from the vault; build() should read
+    # it through indexed_vault_notes
+    ensure_vault_indexed()
+    return versioned_response(request, name, lambda: vault_version, build)
+
+def forget_note(note):
+    note_cache.invalidate(note_path(note))
+    link_graph.remove(note)
+    text_index.remove(note)
+    tag_index.remove(note)
+    with vault_state_lock:
+        known = vault_notes.pop(note, False) is not False
+    if known:
+        vault_changed()
+
+def apply_vault_events(events):
+    # Bring the note cache and every derived index up to date with notes
+    # created, edited, renamed or deleted outside the app (e.g. in Obsidian)
+    for event in events:
+        if event.old_note:
+            forget_note(event.old_note)
+        if event.kind == "deleted":
+            forget_note(event.note)
+            continue
+        note_cache.invalidate(note_path(event.note))
+        if "Idea" not in event.note and "Piece" not in event.note:
+            continue
+        fetched = fetch_note(event.note)
+        if fetched.error:
+            print(f"Exception in get_note_content for {event.note}:", fetched.error)
+            continue
+        index_note(event.note, fetched.content, fetched.digest)
+    # Even a touch changes the modified times /all_notes reports
+    vault_changed()
+    logger.debug(f"Applied {len(events)} vault changes")
+    summary_prewarm_requested.set()
+
+@app.on_event("startup")
+def start_vault_watcher():
+    global vault_watcher
+    folder = os.path.join(os.getenv("OBSIDIAN_VAULT_PATH", ""), "UndergraduateAdmission")
+    if VAULT_WATCH == "off" or not os.getenv("OBSIDIAN_VAULT_PATH") or not os.path.isdir(folder):
+        return
+    watcher = VaultWatcher(folder, debounce=VAULT_WATCH_DEBOUNCE, poll_interval=VAULT_WATCH_POLL_INTERVAL, mode=VAULT_WATCH)
+    watcher.subscribe(apply_vault_events)
+    watcher.start()
+    vault_watcher = watcher
+    logger.debug(f"Watching {folder} ({watcher.backend})")
+
+@app.on_event("shutdown")
+def stop_vault_watcher():
+    if vault_watcher is not None:
+        vault_watcher.stop()
+
+def index_note(note, content, digest=None):
+    # Bring every derived index up to date with one note's content
+    link_graph.update(note, content, digest)
+    changed = text_index.update(note, content, digest)
+    tag_index.update(note, content, digest)
+    if "Idea" in note or "Piece" in note:
+        with vault_state_lock:
+            if note not in vault_notes:
+                vault_notes[note] = None
+                changed = True
+    if changed:
+        vault_changed()
+
+def retain_notes(notes):
+    # Drop notes that are no longer in the vault from every derived index
+    link_graph.retain(notes)
+    text_index.retain(notes)
+    tag_index.retain(notes)
+    keep = set(notes)
+    with vault_state_lock:
+        removed = [note for note in vault_notes if note not in keep]
+        for note in removed:
+            del vault_notes[note]
+    if removed:
+        vault_changed()
+
+def display_name(note):
+    # "Idea - Robotics.md" -> "Robotics"
+    return note.replace("Idea - ", "").replace("Piece - ", "").replace(".md", "")
+
+def note_times(note):
+    # (created, modified) from the vault on disk, zeros if it isn't reachable
+    file_path = os.path.join(os.getenv("OBSIDIAN_VAULT_PATH", "."), note_path(note))
+    try:
+        stat = os.stat(file_path)
+        return stat.st_ctime, stat.st_mtime
+    except Exception:
+        return 0.0, 0.0
+
+def search_result(note, content, preview=None, **fields):
+    # Build a SearchResult with the note's metadata; the preview defaults to
+    # the note body without [[connections]]
+    if preview is None:
+        preview = strip_links(content)
+    created, modified = note_times(note)
+    return SearchResult(
+        name=display_name(note),
+        content=preview[:200] + "..." if len(preview) > 200 else preview,
+        type="idea" if note.startswith("Idea -") else "piece",
+        created=created,
+        modified=modified,
+        word_count=len(content.split()),
+        num_connections=link_graph.degree(note),
+        external=is_external_note(content),
+        **fields
+    )
+
+def fetch_note_content(note_name):
+    # Fetch the content of a note from the vault backend
+    return vault.read_note(note_name)
+
+def summarize_note_with_ollama(note_content, raise_unreachable=False):
+    # Summaries are cached on disk by (model, prompt template, content hash).
+    # With raise_unreachable, a ConnectionError (Ollama isn't running) is
+    # raised instead of falling back to the truncated note.
+    key = SummaryCache.key(SUMMARY_MODEL, SUMMARY_PROMPT, note_content)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached
+    prompt = SUMMARY_PROMPT.format(note_content=note_content)
+    try:
+        response = ollama_executor.call(
+            SUMMARY_MODEL,
+            [prompt],
+            lambda: ollama.generate(model=SUMMARY_MODEL, prompt=prompt)
+        )
+        summary = response['response'].strip()
+    except Exception as e:
+        if raise_unreachable and isinstance(e, ConnectionError):
+            raise
         print("Ollama summarization error:", e)
         return note_content[:200]  # fallback: truncate
+    summary_cache.put(key, summary)
+    return summary
+
+def prewarm_summaries():
+    # Summarize every note that has no cached summary yet, so /submit only
+    # pays for notes edited since the last pass
+    filtered_notes = [note for note in list_obsidian_notes() if "Idea" in note or "Piece" in note]
+    summarized = 0
+    for fetched in fetch_notes(filtered_notes):
+        if fetched.error:
+            continue
+        if SummaryCache.key(SUMMARY_MODEL, SUMMARY_PROMPT, fetched.content) in summary_cache:
+            continue
+        # Stops the pass with a ConnectionError when Ollama is down, rather
+        # than failing once per remaining note
+        summarize_note_with_ollama(fetched.content, raise_unreachable=True)
+        summarized += 1
+    return summarized
+
+def summary_prewarm_loop():
+    retry_delay = SUMMARY_PREWARM_RETRY
+    while True:
+        try:
+            summarized = prewarm_summaries()
+            if summarized:
+                logger.debug(f"Pre-warmed {summarized} note summaries")
+            retry_delay = SUMMARY_PREWARM_RETRY
+        except ConnectionError as e:
+            # Ollama is unreachable: sleep through any triggers, then retry
+            # with a doubling delay (capped at the regular interval)
+            print(f"Ollama unreachable, retrying summary pre-warm in {retry_delay:.0f}s:", e)
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max(SUMMARY_PREWARM_INTERVAL, SUMMARY_PREWARM_RETRY))
+            summary_prewarm_requested.clear()
+            continue
+        except Exception as e:
+            print("Error pre-warming summaries:", e)
+        summary_prewarm_requested.wait(SUMMARY_PREWARM_INTERVAL)
+        summary_prewarm_requested.clear()
+
+@app.on_event("startup")
+def start_job_queue():
+    job_queue.register("connect_note", connect_note_job)
+    job_queue.start()
+
+@app.on_event("startup")
+def start_summary_prewarm():
+    if SUMMARY_PREWARM_INTERVAL > 0:
+        threading.Thread(target=summary_prewarm_loop, name="summary-prewarm", daemon=True).start()
 
 def suggest_connections(content, existing_notes, new_note_name=None):
     # Filter to only include notes with "Idea" or "Piece" in the name
     filtered_notes = [note for note in existing_notes if "Idea" in note or "Piece" in note]
     # Fetch and summarize each note, skipping the new note itself
+    if new_note_name:
+        filtered_notes = [note for note in filtered_notes if note != note_key(new_note_name)]
+    note_contents = {}
+    for fetched in fetch_notes(filtered_notes):
+        if fetched.error:
+            print(f"Exception in get_note_content for {fetched.name}:", fetched.error)
+        else:
+            index_note(fetched.name, fetched.content, fetched.digest)
+        note_contents[fetched.name] = fetched.content
+    # Only the most promising candidates are summarized and sent to gpt-4o
+    candidates = connection_candidates(content, note_contents, SUGGEST_CANDIDATES)
+    # Summaries run in parallel on the Ollama executor
+    summaries = [ollama_executor.pool.submit(summarize_note_with_ollama, note_contents[note]) for note in candidates]
     summarized_notes = {}
-    for note_name in filtered_notes:
-        if new_note_name and note_name == new_note_name:
-            continue
-        note_content = get_note_content(note_name)
-        summary = summarize_note_with_ollama(note_content)
-        summarized_notes[note_name] = summary
+    for note, summary in zip(candidates, summaries):
+        summarized_notes[note] = summary.result()
     # Use OpenAI to suggest relevant note names
-    response = client.responses.parse(
-        model="gpt-4o-2024-08-06",
-        input=[
-            {"role": "system", "content": "Take the following note summaries and select relevant note names for thematic and otherwise relevant connections across ideas, give a short reason why. Be selective, these connections are meant to be helpful in writing essays. Not eveything connects to everything else. Return full note names."},
-            {"role": "user", "content": f"Notes: {str(summarized_notes)}"},
-            {"role": "user", "content": "Content: " + content},
-        ],
-        text_format=SelectedConnections,
+    messages = [
+        {"role": "system", "content": "Take the following note summaries and select relevant note names for thematic and otherwise relevant connections across ideas, give a short reason why. Be selective, these connections are meant to be helpful in writing essays. Not eveything connects to everything else. Return full note names."},
+        {"role": "user", "content": f"Notes: {str(summarized_notes)}"},
+        {"role": "user", "content": "Content: " + content},
+    ]
+    response = openai_executor.call(
+        "gpt-4o-2024-08-06",
+        messages,
+        lambda: client.responses.parse(model="gpt-4o-2024-08-06", input=messages, text_format=SelectedConnections),
+        tokens=estimate_tokens(messages[1]["content"] + content) + 500
     )
     notes = response.output_parsed
     print(content, notes)
     return notes
 
-def add_connection(note_name, connection, reason):
-    # Fetch current note content
-    # Add "UndergraduateAdmission/" prefix if not already present
-    if not note_name.startswith("UndergraduateAdmission/"):
-        note_name = f"UndergraduateAdmission/{note_name}"
-    
-    current_content = get_note_content(note_name)
-    # Append the connection with reason
-    appended_content = f"\n[[{connection}]] — {reason}"
-    new_content = current_content + appended_content
-    # Update the note using PUT
-    url = f"{OBSIDIAN_HOST}/vault/{note_name}"
-    headers = {
-        "Authorization": f"Bearer {OBSIDIAN_API_KEY}",
-        "Content-Type": "text/markdown",
-        "accept": "*/*"
-    }
+def connection_candidates(content, note_contents, limit):
+    # Narrow the vault to the `limit` notes most likely to connect with
+    # content: reciprocal rank fusion of the embedding and BM25 rankings, plus
+    # the notes content already links to and their link-graph neighbours
+    notes = list(note_contents)
+    if len(notes) <= limit:
+        return notes
+    rankings = []
     try:
-        resp = requests.put(url, data=new_content, headers=headers, verify=False)
-        if not resp.ok:
-            print("Obsidian Local REST API error (add_connection):", resp.text)
-            raise Exception(f"Obsidian Local REST API error: {resp.text}")
+        texts = {note: strip_links(note_contents[note]) for note in notes}
+        rankings.append([note for note, _ in embedding_store.search(content, texts, k=limit * 2)])
     except Exception as e:
-        print("Exception in add_connection:", e)
-        raise HTTPException(status_code=500, detail=f"Obsidian Local REST API error: {e}")
+        print("Embedding retrieval unavailable for connection candidates:", e)
+    rankings.append([note for note, _ in text_index.rank(content, limit=limit * 3) if note in note_contents][:limit * 2])
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, note in enumerate(ranking):
+            fused[note] += 1.0 / (60 + rank)
+    for target in set(parse_links(content)):
+        for note in link_graph.resolve(target):
+            fused[note] += 1.0 / 60
+            for neighbor in link_graph.neighbors(note):
+                fused[neighbor] += 0.5 / 60
+    ranked = sorted((note for note in fused if note in note_contents), key=lambda note: (-fused[note], note))
+    return ranked[:limit]
+
+def note_lock(note_name):
+    # One lock per note, so read-modify-writes of the same note never interleave
+    with note_locks_guard:
+        return note_locks[note_path(note_name)]
+
+def append_connections(note_name, connections):
+    # Append every (connection, reason) to the note in a single write,
+    # skipping links the note already has. Returns the connections added.
+    note_name = note_path(note_name)
+    with note_lock(note_name):
+        # Read fresh so the duplicate check (and a PUT fallback) sees the latest content
+        note_cache.invalidate(note_name)
+        try:
+            current_content = read_note(note_name).content
+        except Exception as e:
+            print("Exception in append_connections:", e)
+            raise HTTPException(status_code=500, detail=f"Obsidian Local REST API error: {e}")
+        existing = set(parse_links(current_content))
+        appended_content = ""
+        added = []
+        for connection, reason in connections:
+            target = normalize_target(connection or "")
+            if not target or target in existing:
+                continue
+            existing.add(target)
+            appended_content += f"\n[[{connection}]] — {reason}"
+            added.append(connection)
+        if not added:
+            return added
+        try:
+            vault.append_note(note_name, appended_content, current_content)
+        except Exception as e:
+            print("Exception in append_connections:", e)
+            raise HTTPException(status_code=500, detail=f"Obsidian Local REST API error: {e}")
+        finally:
+            note_cache.invalidate(note_name)
+        index_note(note_key(note_name), current_content + appended_content)
+        return added
 
 @app.get("/all_notes")
-def all_notes():
+def all_notes(request: Request):
     try:
-        existing_notes = list_obsidian_notes()
-        # Filter to only include notes with "Idea" or "Piece" in the name
-        filtered_notes = [note for note in existing_notes if "Idea" in note or "Piece" in note]
-        results = []
-        
-        for note in filtered_notes:
-            content = get_note_content(note)
-            note_type = "idea" if note.startswith("Idea -") else "piece"
-            
-            # Metadata - use the full path with UndergraduateAdmission prefix
-            full_note_path = f"UndergraduateAdmission/{note}"
-            file_path = os.path.join(os.getenv("OBSIDIAN_VAULT_PATH", "."), full_note_path)
-            try:
-                stat = os.stat(file_path)
-                created = stat.st_ctime
-                modified = stat.st_mtime
-            except Exception:
-                created = 0.0
-                modified = 0.0
-            
-            word_count = len(content.split())
-            
-            # Count connections
-            outgoing = content.count('[[')
-            incoming = 0
-            note_name_without_ext = note.replace(".md", "")
-            note_name_without_prefix = note_name_without_ext.replace("Idea - ", "").replace("Piece - ", "")
-            
-            for other_note in filtered_notes:
-                if other_note != note:
-                    other_content = get_note_content(other_note)
-                    incoming += other_content.count(f'[[{note_name_without_ext}]]')
-                    incoming += other_content.count(f'[[{note_name_without_prefix}]]')
-            
-            num_connections = outgoing + incoming
-            
-            results.append({
-                "name": note.replace("Idea - ", "").replace("Piece - ", "").replace(".md", ""),
-                "type": note_type,
-                "content": content,
-                "created": created,
-                "modified": modified,
-                "word_count": word_count,
-                "num_connections": num_connections,
-                "external": is_external_note(content)
-            })
-        
-        return {"notes": results}
+        return vault_response(request, "all_notes", vault_note_records)
     except Exception as e:
         print("Error in all_notes:", e)
         raise HTTPException(status_code=500, detail=f"Error fetching notes: {e}")
 
-@app.get("/note_content/{note_name}")
+@app.get("/all_notes/stream")
+def all_notes_stream(request: Request):
+    # Each note is sent as soon as it's fetched. Connection counts in those
+    # events only include links from notes loaded so far; the final frame
+    # carries the complete counts for every note.
+    return stream_events(all_notes_events(), request)
+
+def all_notes_events():
+    existing_notes = list_obsidian_notes()
+    # Filter to only include notes with "Idea" or "Piece" in the name
+    filtered_notes = [note for note in existing_notes if "Idea" in note or "Piece" in note]
+    total = len(filtered_notes)
+    done = 0
+    for fetched in fetch_notes_as_completed(filtered_notes):
+        done += 1
+        if fetched.error:
+            print(f"Exception in get_note_content for {fetched.name}:", fetched.error)
+        else:
+            index_note(fetched.name, fetched.content, fetched.digest)
+        yield {"type": "note", "note": note_record(fetched.name, fetched.content)}
+        if done % 10 == 0 or done == total:
+            yield {"type": "progress", "done": done, "total": total}
+    retain_notes(filtered_notes)
+    yield {"type": "final", "num_connections": {
+        display_name(note): link_graph.degree(note) for note in filtered_notes
+    }}
+
+def vault_note_records():
+    filtered_notes, note_contents = indexed_vault_notes()
+    return {"notes": [note_record(note, note_contents[note]) for note in filtered_notes]}
+
+def note_record(note, content):
+    # One /all_notes entry
+    created, modified = note_times(note)
+    return {
+        "name": display_name(note),
+        "type": "idea" if note.startswith("Idea -") else "piece",
+        "content": content,
+        "created": created,
+        "modified": modified,
+        "word_count": len(content.split()),
+        "num_connections": link_graph.degree(note),
+        "external": is_external_note(content)
+    }
+
+@app.get("/note_content/{note_name}", response_class=FastJSONResponse)
 def get_note_content_by_name(note_name: str):
     try:
         # Try to find the note with different prefixes in the UndergraduateAdmission directory
@@ -1060,5 +1548,88 @@ def get_note_content_by_name(note_name: str):
         print("Error getting note content:", e)
         raise HTTPException(status_code=500, detail=f"Error getting note content: {e}")
 
+# --- Graph analytics over the [[link]] graph ---
+# Notes are addressed by display name ("Robotics") or file name ("Idea - Robotics.md");
+# direction is "out" (links), "in" (backlinks) or "both"
+GraphDirection = Literal["out", "in", "both"]
+
+def resolve_graph_note(name):
+    ensure_vault_indexed()
+    for candidate in [name, f"{name}.md", f"Idea - {name}.md", f"Piece - {name}.md"]:
+        if candidate in link_graph:
+            return candidate
+    raise HTTPException(status_code=404, detail=f"Note not found: {name}")
+
+def graph_note(note, **fields):
+    return {"name": display_name(note), "type": "idea" if note.startswith("Idea -") else "piece", **fields}
+
+@app.get("/graph/neighbors/{note_name}", response_class=FastJSONResponse)
+def graph_neighbors(note_name: str, direction: GraphDirection = "both"):
+    note = resolve_graph_note(note_name)
+    return {"note": graph_note(note), "neighbors": [graph_note(n) for n in graph_analytics.neighbors(note, direction)]}
+
+@app.get("/graph/khop/{note_name}", response_class=FastJSONResponse)
+def graph_k_hop(note_name: str, k: int = 2, direction: GraphDirection = "both"):
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    note = resolve_graph_note(note_name)
+    distances = graph_analytics.k_hop(note, k, direction)
+    notes = sorted(distances, key=lambda n: (distances[n], n))
+    return {"note": graph_note(note), "k": k, "notes": [graph_note(n, distance=distances[n]) for n in notes]}
+
+@app.get("/graph/path", response_class=FastJSONResponse)
+def graph_shortest_path(source: str, target: str, direction: GraphDirection = "both"):
+    path = graph_analytics.shortest_path(resolve_graph_note(source), resolve_graph_note(target), direction)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No path from {source} to {target}")
+    return {"path": [graph_note(n) for n in path], "length": len(path) - 1}
+
+@app.get("/graph/components", response_class=FastJSONResponse)
+def graph_components():
+    ensure_vault_indexed()
+    components = graph_analytics.components()
+    return {"count": len(components), "components": [[graph_note(n) for n in group] for group in components]}
+
+@app.get("/graph/communities", response_class=FastJSONResponse)
+def graph_communities(iterations: int = 10):
+    ensure_vault_indexed()
+    communities = graph_analytics.communities(max(1, min(iterations, 100)))
+    return {"count": len(communities), "communities": [[graph_note(n) for n in group] for group in communities]}
+
+@app.get("/graph/orphans", response_class=FastJSONResponse)
+def graph_orphans():
+    ensure_vault_indexed()
+    return {"orphans": [graph_note(n) for n in graph_analytics.orphans()]}
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    # Upstream calls of a request sent with "X-Trace: 1" (or ?trace=1); the id is in its X-Trace-Id header
+    trace = metrics.trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return {
+        "notes": note_cache.stats(),
+        "summaries": summary_cache.stats(),
+        "graph": graph_analytics.stats(),
+        "responses": response_cache.stats(),
+        "watcher": {
+            "backend": vault_watcher.backend if vault_watcher else None,
+            "events": vault_watcher.events_published if vault_watcher else 0,
+        },
+        "llm": {"openai": openai_executor.stats(), "ollama": ollama_executor.stats()}
+    }
+
+@app.get("/obsidian/stats")
+def get_obsidian_stats():
+    return {"requests": obsidian.stats()}
+
 def is_external_note(content):
     return content.splitlines()[0].strip() == "#extern" if content else False
\ No newline at end of file
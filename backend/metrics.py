@@ -0,0 +1,279 @@
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Trace of the request being handled, if it asked for one
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    # ThreadPoolExecutor that runs each task in a copy of the submitter's
+    # context, so upstream calls made on pool threads land in the request's trace
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Trace:
+    # Every upstream call made while handling one request
+    def __init__(self, method, path):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.calls = []
+        self.status = None
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def record(self, service, operation, seconds, error, detail=None):
+        now = time.perf_counter()
+        with self._lock:
+            self.calls.append({
+                "service": service,
+                "operation": operation,
+                "detail": detail,
+                "start_ms": round((now - seconds - self.started) * 1000, 3),
+                "duration_ms": round(seconds * 1000, 3),
+                "error": error,
+            })
+
+    def to_dict(self):
+        with self._lock:
+            calls = sorted(self.calls, key=lambda call: call["start_ms"])
+        totals = defaultdict(lambda: {"calls": 0, "duration_ms": 0.0})
+        for call in calls:
+            total = totals[f"{call['service']} {call['operation']}"]
+            total["calls"] += 1
+            total["duration_ms"] = round(total["duration_ms"] + call["duration_ms"], 3)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+            "totals": dict(totals),
+            "calls": calls,
+        }
+
+
+class Metrics:
+    # In-process metrics registry rendered in the Prometheus text format:
+    # per-route request counts, latency/size histograms and in-flight gauges,
+    # upstream call counters and latency histograms, plus gauges collected on
+    # demand from the app's caches. Also keeps the most recent request traces.
+
+    def __init__(self, trace_capacity=200):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.durations = {}
+        self.request_sizes = {}
+        self.response_sizes = {}
+        self.in_flight = defaultdict(int)
+        self.upstream_calls = defaultdict(int)
+        self.upstream_durations = {}
+        self._collectors = []
+        self.trace_capacity = trace_capacity
+        self.traces = OrderedDict()
+
+    def register_collector(self, name, help_text, collect, kind="gauge"):
+        # collect() -> {labels dict as tuple of (key, value) pairs: value}
+        self._collectors.append((name, help_text, kind, collect))
+
+    def request_started(self, route):
+        with self._lock:
+            self.in_flight[route] += 1
+
+    def request_finished(self, route, method, status, seconds, request_bytes, response_bytes):
+        with self._lock:
+            self.in_flight[route] -= 1
+            self.requests[(route, method, str(status))] += 1
+            self._histogram(self.durations, (route, method), LATENCY_BUCKETS).observe(seconds)
+            self._histogram(self.request_sizes, (route,), SIZE_BUCKETS).observe(request_bytes)
+            self._histogram(self.response_sizes, (route,), SIZE_BUCKETS).observe(response_bytes)
+
+    def observe_upstream(self, service, operation, seconds, error=False, detail=None):
+        with self._lock:
+            self.upstream_calls[(service, operation, "error" if error else "ok")] += 1
+            self._histogram(self.upstream_durations, (service, operation), LATENCY_BUCKETS).observe(seconds)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.record(service, operation, seconds, error, detail)
+
+    def keep_trace(self, trace):
+        with self._lock:
+            self.traces[trace.id] = trace
+            while len(self.traces) > self.trace_capacity:
+                self.traces.popitem(last=False)
+
+    def trace(self, trace_id):
+        with self._lock:
+            trace = self.traces.get(trace_id)
+        return trace.to_dict() if trace is not None else None
+
+    def render(self):
+        lines = []
+        with self._lock:
+            self._counter(lines, "friday_http_requests_total", "HTTP requests by route, method and status",
+                          ("route", "method", "status"), self.requests)
+            self._gauge(lines, "friday_http_requests_in_flight", "HTTP requests being handled", ("route",), self.in_flight)
+            self._histograms(lines, "friday_http_request_duration_seconds", "HTTP request latency",
+                             ("route", "method"), self.durations)
+            self._histograms(lines, "friday_http_request_size_bytes", "HTTP request body size",
+                             ("route",), self.request_sizes)
+            self._histograms(lines, "friday_http_response_size_bytes", "HTTP response body size",
+                             ("route",), self.response_sizes)
+            self._counter(lines, "friday_upstream_requests_total",
+                          "Upstream calls (Obsidian by verb, OpenAI/Ollama by model) by outcome",
+                          ("service", "operation", "outcome"), self.upstream_calls)
+            self._histograms(lines, "friday_upstream_request_duration_seconds", "Upstream call latency",
+                             ("service", "operation"), self.upstream_durations)
+        for name, help_text, kind, collect in self._collectors:
+            try:
+                samples = collect()
+            except Exception as e:
+                print(f"Error collecting {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples.items():
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram(histograms, key, buckets):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+
+    @staticmethod
+    def _counter(lines, name, help_text, label_names, values):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{format_labels(zip(label_names, key))} {format_value(value)}")
+
+    @staticmethod
+    def _gauge(lines, name, help_text, label_names, values):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{format_labels(zip(label_names, (key,)))} {format_value(value)}")
+
+    @staticmethod
+    def _histograms(lines, name, help_text, label_names, histograms):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, histogram in sorted(histograms.items()):
+            labels = list(zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(labels + [('le', format_value(bound))])} {cumulative}")
+            lines.append(f"{name}_bucket{format_labels(labels + [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+
+def format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ""
+    escaped = (
+        key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsMiddleware:
+    # ASGI middleware timing every HTTP request by route template. A request
+    # with an "X-Trace: 1" header or "trace=1" query parameter gets a trace of
+    # its upstream calls, returned by id in the X-Trace-Id response header.
+
+    def __init__(self, app, metrics, routes):
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes
+
+    def route_for(self, scope):
+        for route in self.routes():
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = self.route_for(scope)
+        method = scope["method"]
+        headers = dict(scope.get("headers") or [])
+        wants_trace = headers.get(b"x-trace", b"").lower() in (b"1", b"true") \
+            or parse_qs(scope.get("query_string", b"").decode("latin-1")).get("trace", [""])[0] in ("1", "true")
+        trace = Trace(method, scope["path"]) if wants_trace else None
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if trace is not None:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace.id.encode())]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        token = current_trace.set(trace)
+        self.metrics.request_started(route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_trace.reset(token)
+            self.metrics.request_finished(route, method, status["code"], elapsed, sizes["request"], sizes["response"])
+            if trace is not None:
+                trace.status = status["code"]
+                trace.seconds = elapsed
+                self.metrics.keep_trace(trace)
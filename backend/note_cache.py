@@ -0,0 +1,114 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class CachedNote:
+    __slots__ = ("content", "digest", "signature", "size", "cached_at")
+
+    def __init__(self, content, signature):
+        self.content = content
+        self.digest = content_hash(content)
+        self.signature = signature
+        self.size = len(content.encode("utf-8"))
+        self.cached_at = time.monotonic()
+
+
+class NoteCache:
+    # In-process LRU cache of note contents, bounded by total bytes.
+    # An entry stays valid while the file's (mtime, size) signature on disk is
+    # unchanged. When the note can't be stat'ed (no vault path, or a remote
+    # vault) nothing tells us it changed, so the entry only lives for ttl
+    # seconds; ttl=0 doesn't cache such notes at all.
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, vault_path=None, ttl=5.0):
+        self.max_bytes = max_bytes
+        self.vault_path = vault_path
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def signature(self, note_path):
+        # (mtime_ns, size) of the note on disk, or None if we can't stat it
+        if not self.vault_path:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.vault_path, note_path))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, note_path):
+        signature = self.signature(note_path)
+        with self._lock:
+            entry = self._entries.get(note_path)
+            if entry is not None and self._valid(entry, signature):
+                self._entries.move_to_end(note_path)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._drop(note_path)
+            self.misses += 1
+            return None
+
+    def put(self, note_path, content, signature):
+        # signature is the one taken *before* reading content, so a write that
+        # lands in between leaves the entry stale-looking rather than fresh
+        entry = CachedNote(content, signature)
+        with self._lock:
+            if note_path in self._entries:
+                self._drop(note_path)
+            if entry.size > self.max_bytes or (signature is None and self.ttl <= 0):
+                return entry
+            self._entries[note_path] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, note_path):
+        with self._lock:
+            if note_path in self._entries:
+                self._drop(note_path)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _valid(self, entry, signature):
+        if signature is None:
+            return entry.signature is None and time.monotonic() - entry.cached_at < self.ttl
+        return entry.signature == signature
+
+    def _drop(self, note_path):
+        entry = self._entries.pop(note_path)
+        self._bytes -= entry.size
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ObsidianClient:
+    # Shared client for the Obsidian Local REST API. One requests.Session with
+    # a pooled keep-alive adapter, the auth header set once, per-call timeouts
+    # and retry with exponential backoff on connection errors and 429/5xx.
+
+    def __init__(self, host, api_key, connect_timeout=3.05, read_timeout=30.0,
+                 retries=3, backoff=0.3, pool_size=16, verify=False):
+        self.host = host.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.verify = verify
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # POST appends to a note, so it is never replayed
+            allowed_methods=frozenset({"GET", "PUT", "HEAD", "DELETE"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"requests": 0, "errors": 0, "seconds": 0.0})
+        # observer(service, verb, seconds, error, path) is told about every request
+        self.observer = None
+
+    def url(self, path):
+        return f"{self.host}/vault/{quote(path)}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("verify", self.verify)
+        start = time.perf_counter()
+        failed = True
+        try:
+            resp = self.session.request(method, self.url(path), **kwargs)
+            failed = not resp.ok
+            return resp
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats[method]
+                stats["requests"] += 1
+                stats["seconds"] += elapsed
+                if failed:
+                    stats["errors"] += 1
+            if self.observer is not None:
+                self.observer("obsidian", method, elapsed, failed, path)
+
+    def get(self, path, accept="text/markdown"):
+        return self.request("GET", path, headers={"accept": accept})
+
+    def put(self, path, content):
+        return self.request("PUT", path, data=content.encode("utf-8"), headers={
+            "Content-Type": "text/markdown",
+            "accept": "*/*"
+        })
+
+    def post(self, path, content):
+        # Appends content to the end of the note
+        return self.request("POST", path, data=content.encode("utf-8"), headers={
+            "Content-Type": "text/markdown",
+            "accept": "*/*"
+        })
+
+    def stats(self):
+        with self._lock:
+            return {method: dict(stats) for method, stats in self._stats.items()}
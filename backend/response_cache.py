@@ -0,0 +1,78 @@
+import threading
+
+from http_encoding import compress
+
+
+def etag_matches(if_none_match, etag):
+    # Weak comparison of an If-None-Match header against our ETag
+    if not if_none_match:
+        return False
+    tag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+class CachedBody:
+    # One rendered JSON body plus its compressed forms, each made on first use
+    def __init__(self, body, gzip_level=6, brotli_quality=5):
+        self.body = body
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._encoded = {None: body}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        with self._lock:
+            if encoding not in self._encoded:
+                self._encoded[encoding] = compress(self.body, encoding, self.gzip_level, self.brotli_quality)
+            return self._encoded[encoding]
+
+    @property
+    def size(self):
+        with self._lock:
+            return sum(len(body) for body in self._encoded.values())
+
+
+class ResponseCache:
+    # Encoded bodies of read endpoints, one per endpoint, each tagged with the
+    # version of the data it was built from. A lookup with any other version
+    # misses and the next put replaces the entry, so writes never have to
+    # invalidate anything here. Entries keep their gzip/brotli forms too, so
+    # an unchanged body is never re-serialized or re-compressed.
+
+    def __init__(self, gzip_level=6, brotli_quality=5):
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, version):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, name, version, body):
+        entry = CachedBody(body, self.gzip_level, self.brotli_quality)
+        with self._lock:
+            self._entries[name] = (version, entry)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(entry.size for _, entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
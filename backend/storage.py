@@ -0,0 +1,300 @@
+import atexit
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+# Collections kept by the app, and the key each one lived under in the old
+# JSON files ({"prompts": [...]}, {"folders": [...]}; idea boards were a bare list)
+COLLECTIONS = {
+    "prompts": "prompts",
+    "idea_boards": None,
+    "folders": "folders",
+}
+
+
+def legacy_documents(path, key):
+    # Documents from an old JSON file, accepting both a bare list and
+    # {key: [...]}; None if the file doesn't exist
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get(key), list):
+        return data[key]
+    return []
+
+
+class SqliteStore:
+    # Prompts, idea boards and folders as JSON documents in SQLite (WAL),
+    # one row per document keyed by (collection, id). Reads and writes touch
+    # a single row; list() keeps insertion order through seq.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._versions = defaultdict(int)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " collection TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (collection, id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS documents_seq ON documents (collection, seq)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY)")
+        self._db.commit()
+
+    def migrate(self, collection, paths):
+        # One-time import of the first existing legacy JSON file in paths
+        name = f"json:{collection}"
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                return 0
+            imported = 0
+            for path in paths:
+                documents = legacy_documents(path, COLLECTIONS[collection])
+                if documents is None:
+                    continue
+                for document in documents:
+                    document.setdefault("id", str(uuid.uuid4()))
+                    self._insert(collection, document, replace=True)
+                    imported += 1
+                break
+            self._db.execute("INSERT INTO migrations (name) VALUES (?)", (name,))
+            self._db.commit()
+            self._versions[collection] += 1
+            return imported
+
+    def version(self, collection):
+        # Bumped on every change to the collection made through this store
+        with self._lock:
+            return self._versions[collection]
+
+    def list(self, collection):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM documents WHERE collection = ? ORDER BY seq", (collection,)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def get(self, collection, doc_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def insert(self, collection, document):
+        with self._lock:
+            self._insert(collection, document)
+            self._db.commit()
+            self._versions[collection] += 1
+        return document
+
+    def replace(self, collection, document):
+        # Overwrite an existing document; False if there is none with its id
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE documents SET data = ? WHERE collection = ? AND id = ?",
+                (json.dumps(document), collection, document["id"])
+            )
+            self._db.commit()
+            self._versions[collection] += 1
+            return cursor.rowcount > 0
+
+    def update(self, collection, doc_id, change):
+        # Read-modify-write of one document: change(document) edits it in
+        # place. Returns the updated document, or None if it doesn't exist.
+        # If change raises, nothing is written.
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+            ).fetchone()
+            if row is None:
+                return None
+            document = json.loads(row[0])
+            change(document)
+            self._db.execute(
+                "UPDATE documents SET data = ? WHERE collection = ? AND id = ?",
+                (json.dumps(document), collection, doc_id)
+            )
+            self._db.commit()
+            self._versions[collection] += 1
+            return document
+
+    def delete(self, collection, doc_id):
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+            )
+            self._db.commit()
+            self._versions[collection] += 1
+            return cursor.rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _insert(self, collection, document, replace=False):
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        self._db.execute(
+            f"{verb} INTO documents (collection, id, seq, data) VALUES (?, ?,"
+            " (SELECT COALESCE(MAX(seq), 0) + 1 FROM documents WHERE collection = ?), ?)",
+            (collection, document["id"], collection, json.dumps(document))
+        )
+
+
+class JsonDocumentStore:
+    # Same interface as SqliteStore for deployments that keep the JSON files.
+    # Each file is loaded once into an ordered dict by id; mutations mark the
+    # collection dirty and a write-behind thread rewrites the file at most once
+    # per flush_delay, so a burst of edits costs one write. Files are replaced
+    # atomically (temp file + fsync + os.replace), so a crash mid-write leaves
+    # the previous version intact.
+
+    def __init__(self, paths, flush_delay=0.5):
+        self.paths = paths
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._dirty_changed = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._dirty = set()
+        self._thread = None
+        self._documents = {}
+        self._versions = defaultdict(int)
+        for collection, path in paths.items():
+            documents = legacy_documents(path, COLLECTIONS[collection]) or []
+            self._documents[collection] = {}
+            for document in documents:
+                document.setdefault("id", str(uuid.uuid4()))
+                self._documents[collection][document["id"]] = document
+        atexit.register(self.flush)
+
+    def migrate(self, collection, paths):
+        # The JSON files are the store; nothing to import
+        return 0
+
+    def version(self, collection):
+        with self._lock:
+            return self._versions[collection]
+
+    def list(self, collection):
+        with self._lock:
+            return copy.deepcopy(list(self._documents[collection].values()))
+
+    def get(self, collection, doc_id):
+        with self._lock:
+            return copy.deepcopy(self._documents[collection].get(doc_id))
+
+    def insert(self, collection, document):
+        with self._lock:
+            self._documents[collection][document["id"]] = copy.deepcopy(document)
+            self._mark_dirty(collection)
+        return document
+
+    def replace(self, collection, document):
+        with self._lock:
+            documents = self._documents[collection]
+            if document["id"] not in documents:
+                return False
+            documents[document["id"]] = copy.deepcopy(document)
+            self._mark_dirty(collection)
+            return True
+
+    def update(self, collection, doc_id, change):
+        with self._lock:
+            documents = self._documents[collection]
+            if doc_id not in documents:
+                return None
+            # Change a copy, so an exception in change() leaves the stored document alone
+            document = copy.deepcopy(documents[doc_id])
+            change(document)
+            documents[doc_id] = document
+            self._mark_dirty(collection)
+            return copy.deepcopy(document)
+
+    def delete(self, collection, doc_id):
+        with self._lock:
+            if self._documents[collection].pop(doc_id, None) is None:
+                return False
+            self._mark_dirty(collection)
+            return True
+
+    def flush(self):
+        # Write every dirty collection now
+        with self._lock:
+            dirty = list(self._dirty)
+        for collection in dirty:
+            self._write(collection)
+
+    def close(self):
+        self.flush()
+
+    def _mark_dirty(self, collection):
+        self._versions[collection] += 1
+        self._dirty.add(collection)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_behind, name="json-store-writer", daemon=True)
+            self._thread.start()
+        self._dirty_changed.notify()
+
+    def _write_behind(self):
+        while True:
+            with self._lock:
+                while not self._dirty:
+                    self._dirty_changed.wait()
+            # Let a burst of edits pile up before writing
+            time.sleep(self.flush_delay)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing document store: {e}")
+                time.sleep(self.flush_delay)
+
+    def _write(self, collection):
+        # _write_lock keeps the writer thread and flush() from racing on the
+        # same file; the snapshot is taken under _lock so it is consistent
+        with self._write_lock:
+            with self._lock:
+                if collection not in self._dirty:
+                    return
+                self._dirty.discard(collection)
+                documents = list(self._documents[collection].values())
+                key = COLLECTIONS[collection]
+                payload = json.dumps({key: documents} if key else documents, indent=2)
+            try:
+                write_atomic(self.paths[collection], payload)
+            except BaseException:
+                with self._lock:
+                    self._dirty.add(collection)
+                raise
+
+
+def write_atomic(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".friday-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class SummaryCache:
+    # On-disk cache of note summaries keyed by (model, prompt template,
+    # content hash). Backed by a small SQLite file; once the stored summaries
+    # exceed max_bytes the least recently used ones are evicted.
+
+    def __init__(self, path, max_bytes=16 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def key(model, template, content):
+        digest = hashlib.sha256()
+        for part in (model, template, hashlib.sha256(content.encode("utf-8")).hexdigest()):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM summaries WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, key, summary):
+        size = len(summary.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, summary, size, time.time())
+            )
+            self._evict()
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM summaries ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM summaries WHERE key = ?", doomed)
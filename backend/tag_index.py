@@ -0,0 +1,209 @@
+import re
+import threading
+from collections import Counter, defaultdict
+
+TAG_PATTERN = re.compile(r'#([^#\s]+)')
+EXPRESSION_TOKEN = re.compile(r'\s*(\(|\)|&&|\|\||[&|!]|[^\s()&|!]+)')
+OPERATORS = {"and": "and", "&": "and", "&&": "and", "or": "or", "|": "or", "||": "or", "not": "not", "!": "not"}
+
+
+def parse_tags(content):
+    # Tags live on the first line of a note: "#essay #draft"
+    first_line = content.split("\n", 1)[0]
+    if not first_line.startswith("#"):
+        return frozenset()
+    return frozenset(TAG_PATTERN.findall(first_line))
+
+
+class TagExpressionError(ValueError):
+    pass
+
+
+def parse_tag_expression(expression):
+    # "essay AND (draft OR final) AND NOT archived" -> nested tuples:
+    # ("tag", name), ("not", expr), ("and", [exprs]), ("or", [exprs]).
+    # Adjacent tags without an operator are ANDed; "#" before a tag is optional.
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = EXPRESSION_TOKEN.match(expression, position)
+        if match is None:
+            raise TagExpressionError(f"Unexpected character at {position}")
+        tokens.append(match.group(1))
+        position = match.end()
+    if not tokens:
+        raise TagExpressionError("Empty tag expression")
+    parser = _ExpressionParser(tokens)
+    tree = parser.parse_or()
+    if parser.position != len(tokens):
+        raise TagExpressionError(f"Unexpected '{tokens[parser.position]}'")
+    return tree
+
+
+def expression_tags(tree):
+    # Tags the expression asks for (not the ones it excludes)
+    kind, value = tree
+    if kind == "tag":
+        return {value}
+    if kind == "not":
+        return set()
+    return set().union(*(expression_tags(child) for child in value))
+
+
+class _ExpressionParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def operator(self):
+        token = self.peek()
+        return OPERATORS.get(token.lower()) if token is not None else None
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.operator() == "or":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while True:
+            token = self.peek()
+            if token is None or token == ")" or self.operator() == "or":
+                break
+            if self.operator() == "and":
+                self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not(self):
+        token = self.peek()
+        if token is None:
+            raise TagExpressionError("Tag expression ends unexpectedly")
+        if self.operator() == "not":
+            self.take()
+            return ("not", self.parse_not())
+        if token == "(":
+            self.take()
+            tree = self.parse_or()
+            if self.peek() != ")":
+                raise TagExpressionError("Missing ')'")
+            self.take()
+            return tree
+        if token == ")" or self.operator() is not None:
+            raise TagExpressionError(f"Unexpected '{token}'")
+        tag = self.take().lstrip("#")
+        if not tag:
+            raise TagExpressionError("Empty tag")
+        return ("tag", tag)
+
+
+class TagIndex:
+    # Tag -> notes postings over the first-line tags of every note, updated
+    # one note at a time alongside the link graph and text index.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._digests = {}
+        self._tags = {}
+        self._postings = defaultdict(set)
+        self.version = 0
+
+    def __len__(self):
+        return len(self._tags)
+
+    def update(self, note, content, digest=None):
+        with self._lock:
+            if digest is not None and self._digests.get(note) == digest:
+                return False
+            tags = parse_tags(content)
+            self._digests[note] = digest
+            previous = self._tags.get(note)
+            if previous == tags:
+                return False
+            for tag in previous or ():
+                self._discard(tag, note)
+            for tag in tags:
+                self._postings[tag].add(note)
+            self._tags[note] = tags
+            self.version += 1
+            return True
+
+    def remove(self, note):
+        with self._lock:
+            tags = self._tags.pop(note, None)
+            self._digests.pop(note, None)
+            if tags is None:
+                return
+            for tag in tags:
+                self._discard(tag, note)
+            self.version += 1
+
+    def retain(self, notes):
+        keep = set(notes)
+        with self._lock:
+            for note in [n for n in self._tags if n not in keep]:
+                self.remove(note)
+
+    def tags(self, note):
+        with self._lock:
+            return self._tags.get(note, frozenset())
+
+    def evaluate(self, tree):
+        # Notes matching a parsed tag expression
+        with self._lock:
+            return self._evaluate(tree)
+
+    def facets(self, notes):
+        # Tag -> number of the given notes carrying it
+        with self._lock:
+            counts = Counter()
+            for note in notes:
+                counts.update(self._tags.get(note, ()))
+            return counts
+
+    def _evaluate(self, tree):
+        kind, value = tree
+        if kind == "tag":
+            return set(self._postings.get(value, ()))
+        if kind == "not":
+            return set(self._tags) - self._evaluate(value)
+        if kind == "or":
+            return set().union(*(self._evaluate(child) for child in value))
+        # AND: start from the smallest positive operand, then filter
+        children = sorted(value, key=lambda child: (child[0] == "not", self._estimate(child)))
+        matched = self._evaluate(children[0])
+        for child in children[1:]:
+            if not matched:
+                break
+            if child[0] == "not":
+                matched -= self._evaluate(child[1])
+            else:
+                matched &= self._evaluate(child)
+        return matched
+
+    def _estimate(self, tree):
+        kind, value = tree
+        if kind == "tag":
+            return len(self._postings.get(value, ()))
+        return len(self._tags)
+
+    def _discard(self, tag, note):
+        notes = self._postings.get(tag)
+        if notes is None:
+            return
+        notes.discard(note)
+        if not notes:
+            del self._postings[tag]
@@ -0,0 +1,189 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r'\w+')
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+LINK_PATTERN = re.compile(r'\[\[.*?\]\]')
+
+
+def strip_links(content):
+    return LINK_PATTERN.sub('', content)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_query(query):
+    # Split a query into clauses, every one of which has to match:
+    #   "college essay"  -> ("phrase", ["college", "essay"])
+    #   robot*           -> ("prefix", "robot")
+    #   leadership       -> ("term", "leadership")
+    # The last bare word is also read as a prefix, since it's usually still
+    # being typed: "robot" -> ("prefix", "robot") matches robot and robotics.
+    clauses = []
+    for phrase, word in QUERY_PATTERN.findall(query):
+        if phrase:
+            terms = tokenize(phrase)
+            if len(terms) == 1:
+                clauses.append(("term", terms[0]))
+            elif terms:
+                clauses.append(("phrase", terms))
+        elif word.endswith("*") and tokenize(word):
+            clauses.append(("prefix", tokenize(word)[0]))
+        else:
+            clauses.extend(("term", term) for term in tokenize(word))
+    if clauses and clauses[-1][0] == "term" and not query.rstrip().endswith('"'):
+        clauses[-1] = ("prefix", clauses[-1][1])
+    return clauses
+
+
+class InvertedIndex:
+    # Positional inverted index over link-stripped note bodies, ranked with BM25.
+    # Notes are added/replaced one at a time, so keeping it fresh costs
+    # O(changed notes) rather than a rescan of the vault.
+
+    def __init__(self, k1=1.2, b=0.75, max_prefix_expansions=64):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_expansions = max_prefix_expansions
+        self._lock = threading.RLock()
+        # term -> {doc: [positions]}
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._digests = {}
+        self._total_length = 0
+        self._sorted_terms = None
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    def update(self, doc, content, digest=None):
+        with self._lock:
+            if digest is not None and self._digests.get(doc) == digest:
+                return False
+            self._remove(doc)
+            positions = defaultdict(list)
+            tokens = tokenize(strip_links(content))
+            for position, term in enumerate(tokens):
+                positions[term].append(position)
+            for term, term_positions in positions.items():
+                if term not in self._postings:
+                    self._sorted_terms = None
+                self._postings[term][doc] = term_positions
+            self._doc_terms[doc] = set(positions)
+            self._doc_lengths[doc] = len(tokens)
+            self._total_length += len(tokens)
+            self._digests[doc] = digest
+            return True
+
+    def remove(self, doc):
+        with self._lock:
+            self._remove(doc)
+
+    def retain(self, docs):
+        keep = set(docs)
+        with self._lock:
+            for doc in [d for d in self._doc_lengths if d not in keep]:
+                self._remove(doc)
+
+    def search(self, query, limit=10):
+        # Top `limit` (doc, score) pairs; every clause in the query must match
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        with self._lock:
+            candidates = None
+            scored_terms = []
+            for kind, value in clauses:
+                if kind == "term" and value in self._postings:
+                    docs = set(self._postings[value])
+                    scored_terms.append(value)
+                elif kind in ("term", "prefix"):
+                    # Words nothing was indexed under match as prefixes, so
+                    # partial words like "leader" still find "leadership"
+                    expansions = self._expand_prefix(value)
+                    docs = set()
+                    for term in expansions:
+                        docs.update(self._postings[term])
+                    scored_terms.extend(expansions)
+                else:
+                    docs = self._phrase_docs(value)
+                    scored_terms.extend(value)
+                candidates = docs if candidates is None else candidates & docs
+                if not candidates:
+                    return []
+            scored = ((doc, self._score(doc, scored_terms)) for doc in candidates)
+            # Highest score first, ties broken by name
+            return heapq.nsmallest(limit, scored, key=lambda item: (-item[1], item[0]))
+
+    def rank(self, text, limit=10, max_terms=32):
+        # OR-ranking for free text such as a whole note: BM25 over the text's
+        # `max_terms` most selective terms that appear in the index
+        with self._lock:
+            terms = [term for term in set(tokenize(strip_links(text))) if term in self._postings]
+            terms = sorted(terms, key=lambda term: (len(self._postings[term]), term))[:max_terms]
+            candidates = set()
+            for term in terms:
+                candidates.update(self._postings[term])
+            scored = ((doc, self._score(doc, terms)) for doc in candidates)
+            return heapq.nsmallest(limit, scored, key=lambda item: (-item[1], item[0]))
+
+    def _score(self, doc, terms):
+        doc_count = len(self._doc_lengths)
+        avg_length = self._total_length / doc_count if doc_count else 0.0
+        length_norm = 1 - self.b + self.b * (self._doc_lengths[doc] / avg_length if avg_length else 0.0)
+        score = 0.0
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if not postings or doc not in postings:
+                continue
+            tf = len(postings[doc])
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            score += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        return score
+
+    def _phrase_docs(self, terms):
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return set()
+        docs = set(postings[0])
+        for term_postings in postings[1:]:
+            docs &= set(term_postings)
+        matches = set()
+        for doc in docs:
+            following = [set(term_postings[doc]) for term_postings in postings[1:]]
+            for start in postings[0][doc]:
+                if all(start + offset + 1 in positions for offset, positions in enumerate(following)):
+                    matches.add(doc)
+                    break
+        return matches
+
+    def _expand_prefix(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        start = bisect.bisect_left(terms, prefix)
+        expansions = []
+        for term in terms[start:start + self.max_prefix_expansions]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def _remove(self, doc):
+        if doc not in self._doc_lengths:
+            return
+        for term in self._doc_terms.pop(doc):
+            postings = self._postings[term]
+            postings.pop(doc, None)
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+        self._total_length -= self._doc_lengths.pop(doc)
+        self._digests.pop(doc, None)
@@ -0,0 +1,108 @@
+import mmap
+import os
+import tempfile
+
+
+class VaultError(Exception):
+    pass
+
+
+class RestVaultBackend:
+    # Vault access through the Obsidian Local REST API plugin
+
+    def __init__(self, client):
+        self.client = client
+
+    def list_notes(self, folder):
+        resp = self.client.get(f"{folder}/", accept="application/json")
+        if not resp.ok:
+            raise VaultError(f"Obsidian Local REST API error: {resp.text}")
+        # Remove the folder prefix from file names
+        return [file.replace(f"{folder}/", "") for file in resp.json().get("files", [])]
+
+    def read_note(self, path):
+        resp = self.client.get(path)
+        if not resp.ok:
+            raise VaultError(f"Obsidian Local REST API error: {resp.text}")
+        return resp.text
+
+    def write_note(self, path, content):
+        resp = self.client.put(path, content)
+        if not resp.ok:
+            raise VaultError(f"Obsidian Local REST API error: {resp.text}")
+
+    def append_note(self, path, text, current_content):
+        # POST /vault/{path} appends server-side; plugin versions without it
+        # get a full PUT of current_content + text instead
+        resp = self.client.post(path, text)
+        if resp.status_code in (404, 405, 501):
+            self.write_note(path, current_content + text)
+        elif not resp.ok:
+            raise VaultError(f"Obsidian Local REST API error: {resp.text}")
+
+
+class LocalVaultBackend:
+    # Vault access straight from disk, for when the backend runs on the same
+    # machine as the vault. Obsidian picks up our writes through its own
+    # file watcher, so the app stays out of the read path entirely.
+
+    def __init__(self, vault_path, mmap_threshold=64 * 1024):
+        self.vault_path = vault_path
+        self.mmap_threshold = mmap_threshold
+
+    def full_path(self, path):
+        return os.path.join(self.vault_path, path)
+
+    def list_notes(self, folder):
+        try:
+            with os.scandir(self.full_path(folder)) as entries:
+                return sorted(
+                    entry.name for entry in entries
+                    if entry.is_file() and not entry.name.startswith(".")
+                )
+        except OSError as e:
+            raise VaultError(f"Can't list {folder}: {e}")
+
+    def read_note(self, path):
+        try:
+            with open(self.full_path(path), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size >= self.mmap_threshold:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        data = mapped[:]
+                else:
+                    data = f.read()
+        except OSError as e:
+            raise VaultError(f"Can't read {path}: {e}")
+        return data.decode("utf-8")
+
+    def append_note(self, path, text, current_content):
+        self.write_note(path, current_content + text)
+
+    def write_note(self, path, content):
+        # Write to a temp file in the same directory, fsync, then rename over
+        # the note so readers (and Obsidian) never see a half-written file
+        target = self.full_path(path)
+        directory = os.path.dirname(target)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                mode = os.stat(target).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o644
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".friday-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content.encode("utf-8"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, target)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            raise VaultError(f"Can't write {path}: {e}")
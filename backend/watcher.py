@@ -0,0 +1,223 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class NoteEvent(NamedTuple):
+    kind: str  # "created", "modified", "deleted" or "renamed"
+    note: str
+    old_note: Optional[str] = None  # previous name, for "renamed"
+
+
+def file_signature(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class VaultWatcher:
+    # Watches one vault folder (not recursive) and publishes debounced
+    # per-note events to subscribers. inotify only tells us which names were
+    # touched; after debounce seconds of quiet those names are stat'ed and
+    # compared with what we saw last, so bursts (editor saves, temp file +
+    # rename) collapse into one event per note. A note that disappears while
+    # another appears with the same inode is reported as a rename. Without
+    # inotify the whole folder is rescanned every poll_interval seconds.
+    # Dotfiles (including our own temp files) are ignored.
+
+    def __init__(self, folder, debounce=0.25, poll_interval=2.0, mode="auto"):
+        self.folder = folder
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode = mode
+        self.backend = None
+        self._subscribers = []
+        self._known = {}
+        self._dirty = set()
+        self._rescan = False
+        self._thread = None
+        self._stopped = threading.Event()
+        self.events_published = 0
+
+    def subscribe(self, consumer):
+        # consumer(events) is called from the watcher thread with a list of NoteEvent
+        self._subscribers.append(consumer)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._known = self._scan()
+        fd = self._inotify() if self.mode in ("auto", "inotify") else None
+        if fd is None and self.mode == "inotify":
+            print(f"inotify unavailable for {self.folder}, polling instead")
+        self.backend = "inotify" if fd is not None else "poll"
+        target = self._inotify_loop if fd is not None else self._poll_loop
+        args = (fd,) if fd is not None else ()
+        self._thread = threading.Thread(target=target, args=args, name="vault-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def flush(self):
+        # Compare touched names (or the whole folder) with the last state and publish
+        if self._rescan:
+            current = self._scan()
+            names = set(current) | set(self._known)
+        else:
+            names = self._dirty
+            current = {}
+            for name in names:
+                try:
+                    current[name] = file_signature(os.stat(os.path.join(self.folder, name)))
+                except OSError:
+                    pass
+        self._dirty = set()
+        self._rescan = False
+
+        created, deleted, events = {}, {}, []
+        for name in sorted(names):
+            before, after = self._known.get(name), current.get(name)
+            if before == after:
+                continue
+            if before is None:
+                created[name] = after
+            elif after is None:
+                deleted[name] = before
+            else:
+                events.append(NoteEvent("modified", name))
+        # A name that vanished and one that appeared on the same inode is a rename
+        by_inode = {signature[0]: name for name, signature in deleted.items()}
+        for name, signature in created.items():
+            old_name = by_inode.pop(signature[0], None)
+            if old_name is not None:
+                del deleted[old_name]
+                events.append(NoteEvent("renamed", name, old_name))
+            else:
+                events.append(NoteEvent("created", name))
+        events.extend(NoteEvent("deleted", name) for name in deleted)
+
+        for name in names:
+            if name in current:
+                self._known[name] = current[name]
+            else:
+                self._known.pop(name, None)
+        if events:
+            self._publish(events)
+        return events
+
+    def _publish(self, events):
+        self.events_published += len(events)
+        for consumer in self._subscribers:
+            try:
+                consumer(events)
+            except Exception as e:
+                print(f"Vault watcher consumer failed: {e}")
+
+    def _scan(self):
+        signatures = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        if entry.is_file():
+                            signatures[entry.name] = file_signature(entry.stat())
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return signatures
+
+    def _poll_loop(self):
+        while not self._stopped.wait(self.poll_interval):
+            self._rescan = True
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Vault watcher error: {e}")
+
+    def _inotify(self):
+        # inotify file descriptor watching the folder, or None if unavailable
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, os.fsencode(self.folder), WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _inotify_loop(self, fd):
+        deadline = None
+        try:
+            while not self._stopped.is_set():
+                timeout = self.poll_interval if deadline is None else max(0.0, deadline - time.monotonic())
+                readable, _, _ = select.select([fd], [], [], timeout)
+                if readable:
+                    try:
+                        data = os.read(fd, 64 * 1024)
+                    except BlockingIOError:
+                        data = b""
+                    if not self._collect(data):
+                        # The folder itself went away: keep going by polling
+                        self._rescan = True
+                        self.flush()
+                        self.backend = "poll"
+                        return self._poll_loop()
+                    if self._dirty or self._rescan:
+                        # Debounce: wait for debounce seconds without new events
+                        deadline = time.monotonic() + self.debounce
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    deadline = None
+                    try:
+                        self.flush()
+                    except Exception as e:
+                        print(f"Vault watcher error: {e}")
+        finally:
+            os.close(fd)
+
+    def _collect(self, data):
+        # Record the names touched by a buffer of inotify events; False if the
+        # watch is gone
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                return False
+            if mask & IN_Q_OVERFLOW:
+                self._rescan = True
+                continue
+            name = os.fsdecode(name)
+            if name and not name.startswith("."):
+                self._dirty.add(name)
+        return True
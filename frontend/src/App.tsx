@@ -47,6 +47,26 @@ import IdeaBoards from './IdeaBoards';
 import PromptsEssays from './PromptsEssays';
 
 const BACKEND_URL = 'http://localhost:8000'; // Change if backend runs elsewhere
+// Give up on a submit's background job after this many long polls (~25 s each)
+const JOB_WAIT_ATTEMPTS = 12;
+
+// Read a newline-delimited JSON stream, calling onEvent for every event as it arrives
+const readNdjson = async (res: Response, onEvent: (event: any) => void) => {
+  const reader = res.body!.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() || '';
+    for (const line of lines) {
+      if (line.trim()) onEvent(JSON.parse(line));
+    }
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+};
 
 function App() {
   const [currentPage, setCurrentPage] = useState<'main' | 'idea-boards' | 'prompts-essays'>('main');
@@ -56,6 +76,8 @@ function App() {
   const [suggestions, setSuggestions] = useState<string[]>([]);
   const [selected, setSelected] = useState<string[]>([]);
   const [noteName, setNoteName] = useState('');
+  // Vault path of the last submitted note, for /connect
+  const [submittedNote, setSubmittedNote] = useState('');
   const [connectLoading, setConnectLoading] = useState(false);
   const [success, setSuccess] = useState('');
   const [error, setError] = useState('');
@@ -106,7 +128,7 @@ function App() {
     setLoading(true);
     setSuggestions([]);
     setSelected([]);
-    setNoteName('');
+    setSubmittedNote('');
     setError('');
     setSuccess('');
     try {
@@ -117,12 +139,20 @@ function App() {
       });
       if (!res.ok) throw new Error('Submission failed');
       const data = await res.json();
-      setSuggestions(data.suggestions || []);
-      setNoteName(data.note_name || '');
       setSuccess('Note submitted successfully!');
       setContent('');
       setNoteName('');
       fetchStats(); // Refresh stats after successful submission
+      setLoading(false);
+      // Connections are suggested and linked in a background job
+      const job = await waitForJob(data.job_id);
+      if (job.status === 'done') {
+        setSuggestions(job.result?.suggestions || []);
+        setSubmittedNote(job.result?.note_name || data.note_name);
+        fetchStats();
+      } else {
+        setError(job.error || 'Finding connections failed');
+      }
     } catch (err: any) {
       setError(err.message || 'Error submitting');
     } finally {
@@ -130,6 +160,17 @@ function App() {
     }
   };
 
+  const waitForJob = async (jobId: string) => {
+    for (let attempt = 0; attempt < JOB_WAIT_ATTEMPTS; attempt++) {
+      const res = await fetch(`${BACKEND_URL}/jobs/${jobId}?wait=25`);
+      if (res.status === 404) throw new Error('Finding connections failed: the job was lost');
+      if (!res.ok) throw new Error('Failed to check submission status');
+      const job = await res.json();
+      if (job.status === 'done' || job.status === 'failed') return job;
+    }
+    throw new Error('Timed out waiting for connection suggestions');
+  };
+
   const handleConnect = async () => {
     setConnectLoading(true);
     setError('');
@@ -138,14 +179,13 @@ function App() {
       const res = await fetch(`${BACKEND_URL}/connect`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ new_note: noteName, connections: selected })
+        body: JSON.stringify({ new_note: submittedNote, connections: selected })
       });
       if (!res.ok) throw new Error('Connection failed');
       setSuccess('Connections added!');
       setSuggestions([]);
       setSelected([]);
-      setNoteName('');
-      setContent('');
+      setSubmittedNote('');
       fetchStats(); // Refresh stats after successful connection
     } catch (err: any) {
       setError(err.message || 'Error connecting');
@@ -216,16 +256,23 @@ function App() {
     try {
       let results: any[] = [];
       
-      // Perform regular search if query is provided
+      // Perform regular search if query is provided, showing results as they stream in
       if (searchQuery.trim()) {
-        const res = await fetch(`${BACKEND_URL}/search`, {
+        const res = await fetch(`${BACKEND_URL}/search/stream`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ query: searchQuery, mode: searchMode })
         });
         if (!res.ok) throw new Error('Search failed');
-        const data = await res.json();
-        results = data.results || [];
+        await readNdjson(res, (event) => {
+          if (event.type === 'result') {
+            setSearchResults(prev => [...prev, event.result]);
+          } else if (event.type === 'final') {
+            results = event.results || [];
+          } else if (event.type === 'error') {
+            throw new Error(event.detail || 'Search failed');
+          }
+        });
       }
       
       // Perform tag search if tags are provided
@@ -71,6 +71,12 @@ interface IdeaBoard {
   modified: number;
 }
 
+interface BoardOp {
+  op: 'add_node' | 'move_node' | 'update_node' | 'remove_node' | 'add_edge' | 'update_edge' | 'remove_edge';
+  id: string;
+  data?: Record<string, unknown>;
+}
+
 interface Note {
   name: string;
   type: 'idea' | 'piece';
@@ -194,6 +200,30 @@ function IdeaBoards() {
     }
   };
 
+  // Send add/move/update/remove ops for the selected board. The server
+  // rejects the patch (409) if the board changed since we last saw it.
+  const patchBoard = async (ops: BoardOp[]): Promise<IdeaBoard | null> => {
+    if (!selectedBoard) return null;
+    const res = await fetch(`${BACKEND_URL}/idea_boards/${selectedBoard.id}`, {
+      method: 'PATCH',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ base_modified: selectedBoard.modified, ops, modified: Date.now() })
+    });
+    if (res.status === 409) {
+      const data = await res.json();
+      const current: IdeaBoard = data.detail.board;
+      setSelectedBoard(current);
+      setBoards(prev => prev.map(b => (b.id === current.id ? current : b)));
+      throw new Error('Board was changed elsewhere, reloaded the latest version');
+    }
+    if (!res.ok) return null;
+    const data = await res.json();
+    const board: IdeaBoard = data.board;
+    setSelectedBoard(board);
+    setBoards(prev => prev.map(b => (b.id === board.id ? board : b)));
+    return board;
+  };
+
   const addNodeToBoard = async () => {
     if (!selectedBoard || !selectedNote) return;
     
@@ -207,23 +237,10 @@ function IdeaBoards() {
       external: note.external
     };
     
-    const updatedBoard = {
-      ...selectedBoard,
-      nodes: [...selectedBoard.nodes, newNode],
-      modified: Date.now()
-    };
-    
     try {
-      const res = await fetch(`${BACKEND_URL}/idea_boards/${selectedBoard.id}`, {
-        method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(updatedBoard)
-      });
-      if (res.ok) {
-        setSelectedBoard(updatedBoard);
+      if (await patchBoard([{ op: 'add_node', id: newNode.id, data: { ...newNode } }])) {
         setAddNodeDialogOpen(false);
         setSelectedNote('');
-        fetchBoards();
         setSuccess('Node added successfully!');
       }
     } catch (err: any) {
@@ -234,22 +251,8 @@ function IdeaBoards() {
   const removeNodeFromBoard = async (nodeId: string) => {
     if (!selectedBoard) return;
     
-    const updatedBoard = {
-      ...selectedBoard,
-      nodes: selectedBoard.nodes.filter(n => n.id !== nodeId),
-      edges: selectedBoard.edges.filter(e => e.source !== nodeId && e.target !== nodeId),
-      modified: Date.now()
-    };
-    
     try {
-      const res = await fetch(`${BACKEND_URL}/idea_boards/${selectedBoard.id}`, {
-        method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(updatedBoard)
-      });
-      if (res.ok) {
-        setSelectedBoard(updatedBoard);
-        fetchBoards();
+      if (await patchBoard([{ op: 'remove_node', id: nodeId }])) {
         setSuccess('Node removed successfully!');
       }
     } catch (err: any) {
@@ -257,6 +260,16 @@ function IdeaBoards() {
     }
   };
 
+  const moveNode = async (node: Node) => {
+    if (!selectedBoard || node.x === undefined || node.y === undefined) return;
+    
+    try {
+      await patchBoard([{ op: 'move_node', id: node.id, data: { x: node.x, y: node.y } }]);
+    } catch (err: any) {
+      setError(err.message || 'Error moving node');
+    }
+  };
+
   const addEdge = async (sourceId: string, targetId: string) => {
     if (!selectedBoard) return;
     
@@ -283,23 +296,10 @@ function IdeaBoards() {
       targetName: targetNode.name
     };
     
-    const updatedBoard = {
-      ...selectedBoard,
-      edges: [...selectedBoard.edges, newEdge],
-      modified: Date.now()
-    };
-    
     try {
-      const res = await fetch(`${BACKEND_URL}/idea_boards/${selectedBoard.id}`, {
-        method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(updatedBoard)
-      });
-      if (res.ok) {
-        setSelectedBoard(updatedBoard);
+      if (await patchBoard([{ op: 'add_edge', id: edgeId, data: { ...newEdge } }])) {
         setConnectSource('');
         setConnectTarget('');
-        fetchBoards();
         setSuccess('Connection created successfully!');
       }
     } catch (err: any) {
@@ -310,28 +310,11 @@ function IdeaBoards() {
   const updateEdgeNote = async () => {
     if (!selectedBoard || !selectedEdge) return;
     
-    const updatedBoard = {
-      ...selectedBoard,
-      edges: selectedBoard.edges.map(edge => 
-        edge.id === selectedEdge.id 
-          ? { ...edge, note: edgeNote }
-          : edge
-      ),
-      modified: Date.now()
-    };
-    
     try {
-      const res = await fetch(`${BACKEND_URL}/idea_boards/${selectedBoard.id}`, {
-        method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(updatedBoard)
-      });
-      if (res.ok) {
-        setSelectedBoard(updatedBoard);
+      if (await patchBoard([{ op: 'update_edge', id: selectedEdge.id, data: { note: edgeNote } }])) {
         setEdgeDialogOpen(false);
         setSelectedEdge(null);
         setEdgeNote('');
-        fetchBoards();
         setSuccess('Edge note updated successfully!');
       }
     } catch (err: any) {
@@ -342,21 +325,8 @@ function IdeaBoards() {
   const removeEdge = async (edgeId: string) => {
     if (!selectedBoard) return;
     
-    const updatedBoard = {
-      ...selectedBoard,
-      edges: selectedBoard.edges.filter(e => e.id !== edgeId),
-      modified: Date.now()
-    };
-    
     try {
-      const res = await fetch(`${BACKEND_URL}/idea_boards/${selectedBoard.id}`, {
-        method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(updatedBoard)
-      });
-      if (res.ok) {
-        setSelectedBoard(updatedBoard);
-        fetchBoards();
+      if (await patchBoard([{ op: 'remove_edge', id: edgeId }])) {
         setSuccess('Connection removed successfully!');
       }
     } catch (err: any) {
@@ -611,6 +581,7 @@ function IdeaBoards() {
                     linkColor={(link: Edge) => link.color || '#b0b0b0'}
                     linkWidth={(link: Edge) => link.width || 1}
                     onNodeClick={handleNodeClick}
+                    onNodeDragEnd={(node: Node) => moveNode(node)}
                     onLinkClick={handleLinkClick}
                     onBackgroundClick={handleBackgroundClick}
                     backgroundColor="rgba(30, 30, 50, 0.95)"